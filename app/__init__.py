@@ -1,5 +1,4 @@
 from flask import Flask
-from flasgger import Swagger, APISpec
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
@@ -10,37 +9,73 @@ from flask_socketio import SocketIO
 from flask_limiter.util import get_remote_address
 from config import Config
 
-spec = APISpec()
-
 mail = Mail()
 limiter = Limiter(key_func=get_remote_address, default_limits=["100 per hour", "10 per minute"])
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 socketio = SocketIO(allow_origins=['*'], methods=['GET', 'POST', 'PUT', 'DELETE'])
-swagger = Swagger()
 
-def create_app():
-    app = Flask(__name__)
-    app.config.from_object(Config)
+def create_app(config_class=Config):
+    app = Flask(__name__, template_folder='../templates')
+    app.config.from_object(config_class)
+    
+    from .utils.startup import subsystem_enabled
+    from .utils.log_pipeline import init_logging
+    init_logging(app)
+    from .utils.load_shedding import LoadShedder
+    LoadShedder(app)
+    from .utils.compression import Compression
+    Compression(app)
     
     db.init_app(app)
+    from .utils.db_utils import apply_sqlite_pragmas
+    apply_sqlite_pragmas(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    from .utils.revocation import is_token_revoked
+    jwt.token_in_blocklist_loader(is_token_revoked)
     limiter.init_app(app)
     mail.init_app(app)
-    socketio.init_app(app)
-    swagger.init_app(app)
+    message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    if message_queue:
+        from .utils.socketio_queue import create_client_manager
+        socketio.init_app(app, client_manager=create_client_manager(
+            message_queue, poll_interval=app.config['SOCKETIO_QUEUE_POLL_INTERVAL']))
+    else:
+        socketio.init_app(app)
+    if subsystem_enabled('swagger', app):
+        from flasgger import Swagger
+        Swagger(app)
     
     from .routes.auth_routes import auth_bp
     from .routes.admin_routes import admin_bp
     
-    from .resources import TicketResource, TicketListResource
+    from .resources import (
+        TicketResource, TicketListResource, TicketChangeListResource, TicketClaimResource, TicketLeaseResource,
+        TicketCommentListResource, TicketCommentResource, TicketAttachmentListResource, TicketAttachmentResource
+    )
     api = Api(app)
     api.add_resource(TicketListResource, '/api/tickets')
+    api.add_resource(TicketChangeListResource, '/api/tickets/changes')
+    api.add_resource(TicketClaimResource, '/api/tickets/claim')
+    api.add_resource(TicketLeaseResource, '/api/tickets/<int:ticket_id>/claim')
     api.add_resource(TicketResource, '/api/tickets/<int:ticket_id>')
+    api.add_resource(TicketCommentListResource, '/api/tickets/<int:ticket_id>/comments')
+    api.add_resource(TicketCommentResource, '/api/tickets/<int:ticket_id>/comments/<int:comment_id>')
+    api.add_resource(TicketAttachmentListResource, '/api/tickets/<int:ticket_id>/attachments')
+    api.add_resource(TicketAttachmentResource, '/api/tickets/<int:ticket_id>/attachments/<int:attachment_id>')
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    if subsystem_enabled('ai', app):
+        from .routes.ai_routes import ai_bp
+        app.register_blueprint(ai_bp, url_prefix='/api/auth')
+    if subsystem_enabled('push', app):
+        from .routes.push_routes import push_bp
+        app.register_blueprint(push_bp, url_prefix='/api/auth')
+    
+    from .commands import register_commands
+    register_commands(app)
 
     return app
@@ -0,0 +1,95 @@
+import click
+
+from . import db
+from .models import Ticket
+
+from .utils.startup import import_time_report
+
+
+def register_commands(app):
+    @app.cli.command('import-report')
+    @click.option('--module', default='app', help='Module to import in a fresh interpreter')
+    @click.option('--top', default=15, help='Number of packages to list')
+    @click.option('--max-ms', type=float, default=None, help='Exit non-zero if the import takes longer')
+    def import_report(module, top, max_ms):
+        """Report where the import time of the application goes."""
+        total_us, packages = import_time_report(module)
+        click.echo(f'import {module}: {total_us / 1000:.1f} ms')
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            click.echo(f'  {package:<30} {self_us / 1000:8.1f} ms')
+        if max_ms is not None and total_us / 1000 > max_ms:
+            raise click.ClickException(f'import {module} took {total_us / 1000:.1f} ms (limit {max_ms} ms)')
+    
+    @app.cli.command('backfill-minhash')
+    @click.option('--batch-size', default=5000)
+    def backfill_minhash(batch_size):
+        """Compute duplicate-detection signatures for tickets created before they existed."""
+        from .utils.duplicates import get_duplicate_index
+        from .utils.text_features import ticket_text
+        hasher = get_duplicate_index().hasher
+        total = 0
+        while True:
+            tickets = Ticket.query.filter(Ticket.minhash.is_(None)).order_by(Ticket.id).limit(batch_size).all()
+            if not tickets:
+                break
+            for ticket in tickets:
+                ticket.minhash = hasher.signature(ticket_text(ticket.title, ticket.description)).tobytes()
+            db.session.commit()
+            total += len(tickets)
+            click.echo(f'{total} tickets hashed')
+    
+    @app.cli.command('rebuild-retrieval-index')
+    def rebuild_retrieval_index():
+        """Rebuild the chatbot ticket retrieval index from the database."""
+        from .utils.retrieval import get_retrieval_index
+        from .utils.text_features import ticket_text
+        tickets = db.session.query(Ticket.id, Ticket.title, Ticket.description).order_by(Ticket.id).yield_per(10000)
+        total = get_retrieval_index().rebuild((ticket_id, ticket_text(title, description))
+                                              for ticket_id, title, description in tickets)
+        click.echo(f'{total} tickets indexed')
+    
+    @app.cli.command('archive-tickets')
+    @click.option('--older-than-days', type=int, default=None, help='Defaults to ARCHIVE_AFTER_DAYS')
+    @click.option('--batch-size', type=int, default=None, help='Tickets per archive segment, defaults to ARCHIVE_BATCH_SIZE')
+    def archive_tickets(older_than_days, batch_size):
+        """Move long-closed tickets out of the ticket table into compressed archive segments."""
+        from .utils.archive import archive_closed_tickets
+        older_than_days = older_than_days or app.config['ARCHIVE_AFTER_DAYS']
+        batch_size = batch_size or app.config['ARCHIVE_BATCH_SIZE']
+        total = 0
+        while True:
+            archived = archive_closed_tickets(older_than_days, batch_size)
+            if not archived:
+                break
+            total += archived
+            click.echo(f'{total} tickets archived')
+    
+    @app.cli.command('seed')
+    @click.option('--users', default=50000)
+    @click.option('--tickets', default=1000000)
+    @click.option('--auth-logs', default=2000000)
+    @click.option('--push-subscriptions', default=20000)
+    @click.option('--seed', default=0, help='Same seed and --until give the same rows')
+    @click.option('--until', type=click.DateTime(), default=None, help='Newest timestamp, defaults to today 00:00')
+    @click.option('--days', default=365, help='Length of the generated history')
+    @click.option('--batch-size', default=50000, help='Rows per insert transaction')
+    def seed(users, tickets, auth_logs, push_subscriptions, seed, until, days, batch_size):
+        """Append production-sized synthetic users, tickets, login logs and push subscriptions."""
+        from .utils.seed import seed_database
+        seed_database(users, tickets, auth_logs, push_subscriptions, seed=seed, until=until, days=days,
+                      batch_size=batch_size, echo=click.echo)
+        click.echo('Run backfill-minhash and rebuild-retrieval-index to index the new tickets')
+    
+    @app.cli.command('train-triage-model')
+    @click.option('--holdout', default=0.2, help='Fraction of tickets held out to report accuracy')
+    @click.option('--seed', default=0)
+    def train_triage_model(holdout, seed):
+        """Train the local priority/status classifier from the human labels of historical tickets."""
+        from .utils.triage import train_triage_model as train
+        try:
+            count, report = train(holdout, seed)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        for target, (accuracy, baseline) in report.items():
+            click.echo(f'{target}: accuracy {accuracy:.3f} on held-out tickets (majority baseline {baseline:.3f})')
+        click.echo(f'Model trained on {count} tickets saved to {app.config["TRIAGE_MODEL_PATH"]}')
@@ -1,33 +1,73 @@
-from flask import request, render_template
-from .models import AuthenticationLog, db, User
+import logging
+
+from flask import request, render_template, current_app
+from sqlalchemy.exc import IntegrityError
+from .models import AuthenticationLog, db, User, KnownLoginSource
 from .mailer import send_email
 from datetime import datetime, timedelta
 
-def log_auth_event(user, event):
-    ip_address = request.remote_addr
-    user_agent = request.headers.get('User-Agent')
-    
-    logger = AuthenticationLog(
+logger = logging.getLogger(__name__)
+
+def record_auth_event(user, event):
+    auth_log = AuthenticationLog(
         user_id=user.id if user else None,
         username=user.username if user else request.json.get('username'),
         event=event,
-        ip_address=ip_address,
-        user_agent=user_agent,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent'),
     )
-    db.session.add(logger)
-    db.session.commit()
+    db.session.add(auth_log)
     
+    if user and event == 'LOGIN_SUCCESS' and auth_log.ip_address:
+        remember_login_source(user, auth_log.ip_address, auth_log.user_agent)
+    return auth_log
+
+
+def log_auth_event(user, event):
+    record_auth_event(user, event)
+    db.session.commit()
+    notify_admin_on_suspicious_event(user, event)
+
+
+def notify_admin_on_suspicious_event(user, event):
+    ip_address = request.remote_addr
     if event in ['LOGIN_FAILURE', 'ACCOUNT_LOCKED'] and is_suspicious_login(user, ip_address):
-        notify_admin_if_suspicious_login(user, ip_address, user_agent)
+        notify_admin_if_suspicious_login(user, ip_address, request.headers.get('User-Agent'))
     
     
+def _touch_login_source(user, ip_address, user_agent, now):
+    return KnownLoginSource.query.filter_by(user_id=user.id, ip_address=ip_address).update(
+        {'user_agent': user_agent, 'last_seen_at': now}, synchronize_session=False)
+
+
+def remember_login_source(user, ip_address, user_agent):
+    now = datetime.now()
+    if _touch_login_source(user, ip_address, user_agent, now):
+        return
+    
+    try:
+        with db.session.begin_nested():
+            db.session.add(KnownLoginSource(user_id=user.id, ip_address=ip_address, user_agent=user_agent, last_seen_at=now))
+    except IntegrityError:
+        # A concurrent first login from the same address inserted it first
+        _touch_login_source(user, ip_address, user_agent, now)
+        return
+    # Keep only the most recent sources so the per-user set stays bounded
+    keep = db.session.query(KnownLoginSource.id).filter_by(user_id=user.id)\
+        .order_by(KnownLoginSource.last_seen_at.desc()).limit(current_app.config['KNOWN_LOGIN_SOURCES_COUNT'])
+    KnownLoginSource.query.filter(KnownLoginSource.user_id == user.id, KnownLoginSource.id.notin_(keep.scalar_subquery()))\
+        .delete(synchronize_session=False)
+
+
 def is_suspicious_login(user, current_ip):
     if not user:
         return False
-    recent_logs = AuthenticationLog.query.filter(AuthenticationLog.user_id == user.id, AuthenticationLog.event == 'LOGIN_SUCCESS').order_by(AuthenticationLog.timestamp.desc()).limit(5).all()
-    previous_ips = [log.ip_address for log in recent_logs]
+    query = KnownLoginSource.query.filter_by(user_id=user.id, ip_address=current_ip)
+    max_age_days = current_app.config['KNOWN_LOGIN_SOURCES_MAX_AGE_DAYS']
+    if max_age_days:
+        query = query.filter(KnownLoginSource.last_seen_at >= datetime.now() - timedelta(days=max_age_days))
     
-    return current_ip in previous_ips
+    return query.first() is None
 
 def notify_admin_if_suspicious_login(user, ip_address, user_agent):
     admin_users = User.query.filter_by(role='admin').all()
@@ -41,6 +81,6 @@ def notify_admin_if_suspicious_login(user, ip_address, user_agent):
         
 def clean_old_logs(days=30):
     expiration_date = datetime.now() - timedelta(days=days)
-    old_logs = AuthenticationLog.query.filter(AuthenticationLog.timestamp < expiration_date).all()
+    deleted = AuthenticationLog.query.filter(AuthenticationLog.timestamp < expiration_date).delete(synchronize_session=False)
     db.session.commit()
-    print(f'Deleted {len(old_logs)} old authentication logs')
+    logger.info('Deleted %d old authentication logs', deleted, extra={'deleted': deleted})
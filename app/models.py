@@ -1,3 +1,4 @@
+import json
 import random
 import string
 
@@ -14,7 +15,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, index=True)
     password_hash = db.Column(db.String(128))
     role = db.Column(db.String(20), default='consumer') # consumer, engineer, admin
-    otp_secret = db.Column(db.String(16), default=pyotp.random_base32())
+    otp_secret = db.Column(db.String(32), default=lambda: pyotp.random_base32()) # per row, not once at import
     fallback_otp_secret = db.Column(db.String(6), nullable=True)
     failed_attempts = db.Column(db.Integer, default=0)
     locked_until = db.Column(db.DateTime, nullable=True)
@@ -54,6 +55,36 @@ class User(db.Model):
         self.locked_until = None
         self.failed_attempts = 0
         db.session.commit()
+    
+    @staticmethod
+    def record_failed_login(user_id, max_attempts=3, lock_minutes=15):
+        """
+        Count a failed login and lock the account once `max_attempts` is reached,
+        in a single UPDATE ... RETURNING so concurrent failures cannot lose increments.
+        Returns True if this attempt locked the account, False if it was only counted
+        and None if the account was already locked. The caller owns the commit.
+        """
+        now = datetime.now()
+        attempts = db.func.coalesce(User.failed_attempts, 0) + 1
+        locks = attempts >= max_attempts
+        stmt = (
+            db.update(User)
+            .where(User.id == user_id, db.or_(User.locked_until.is_(None), User.locked_until <= now))
+            .values(
+                failed_attempts=db.case((locks, 0), else_=attempts),
+                locked_until=db.case((locks, now + timedelta(minutes=lock_minutes)), else_=User.locked_until),
+            )
+            .returning(User.locked_until)
+        )
+        row = db.session.execute(stmt, execution_options={'synchronize_session': False}).first()
+        if row is None:
+            return None
+        return row.locked_until is not None and row.locked_until > now
+    
+    @staticmethod
+    def reset_failed_logins(user_id):
+        stmt = db.update(User).where(User.id == user_id, User.failed_attempts != 0).values(failed_attempts=0)
+        db.session.execute(stmt, execution_options={'synchronize_session': False})
 
     @staticmethod
     def verify_reset_token(token, expires_sec=3600):
@@ -73,13 +104,78 @@ class User(db.Model):
         }
 
 
+PRIORITY_RANKS = {'high': 0, 'medium': 1, 'low': 2}
+
+
 class Ticket(db.Model):
+    __table_args__ = (
+        db.Index('ix_ticket_queue', 'status', 'priority_rank', 'created_at', 'id'),
+        db.Index('ix_ticket_due_at', 'due_at'),
+        db.Index('ix_ticket_last_activity_at', 'last_activity_at', 'id'),
+        db.Index('ix_ticket_closed_at', 'closed_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(20), default='open') # open, closed, in_progress
     priority = db.Column(db.String(20), default='medium') # low, medium, high
+    priority_rank = db.Column(db.SmallInteger, default=PRIORITY_RANKS['medium']) # work queue order, 0 is most urgent
+    priority_source = db.Column(db.String(10), nullable=True) # user, triage (predicted) or sla (escalated)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    assignee_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    due_at = db.Column(db.DateTime, nullable=True) # SLA deadline, None once closed or fully escalated
+    escalated_at = db.Column(db.DateTime, nullable=True)
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=True)
+    minhash = db.Column(db.LargeBinary, nullable=True) # MinHash signature of title + description, empty if it has no tokens
+    # Denormalized from ticket_comment, kept in step by TicketComment.add/remove in the same transaction
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime, nullable=True, default=datetime.now)
+    closed_at = db.Column(db.DateTime, nullable=True) # set when the status becomes closed, drives archival
+    attachments = db.relationship('TicketAttachment', backref='ticket', lazy=True, cascade='all, delete-orphan',
+                                  order_by='TicketAttachment.id')
+    
+    @db.validates('priority')
+    def validate_priority(self, key, priority):
+        self.priority_rank = PRIORITY_RANKS.get(priority, PRIORITY_RANKS['medium'])
+        return priority
+    
+    @db.validates('status')
+    def validate_status(self, key, status):
+        if status != 'closed':
+            self.closed_at = None
+        elif self.status != 'closed' or self.closed_at is None:
+            self.closed_at = datetime.now()
+        return status
+    
+    @staticmethod
+    def claim_next(engineer_id, lease_minutes=30):
+        """
+        Atomically lease the most urgent open ticket that is unclaimed or whose lease expired.
+        The pick and the write are one UPDATE statement, so concurrent claimers never get the
+        same ticket and SQLite only holds the write lock for that statement. The caller owns the commit.
+        """
+        now = datetime.now()
+        available = db.or_(Ticket.lease_expires_at.is_(None), Ticket.lease_expires_at < now)
+        candidate = (
+            db.select(Ticket.id)
+            .where(Ticket.status == 'open', available)
+            .order_by(Ticket.priority_rank, Ticket.created_at, Ticket.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            db.update(Ticket)
+            .where(Ticket.id == candidate, available)
+            .values(assignee_id=engineer_id, lease_expires_at=now + timedelta(minutes=lease_minutes))
+            .returning(Ticket.id)
+        )
+        ticket_id = db.session.execute(stmt, execution_options={'synchronize_session': False}).scalar()
+        return db.session.get(Ticket, ticket_id, populate_existing=True) if ticket_id else None
+    
+    def is_claimed_by(self, user_id):
+        return self.assignee_id == user_id and self.lease_expires_at and self.lease_expires_at > datetime.now()
     
     def __repr__(self):
         return f'<Ticket {self.id}: {self.title}>'
@@ -91,17 +187,188 @@ class Ticket(db.Model):
             'description': self.description,
             'status': self.status,
             'priority': self.priority,
+            'created_at': self.created_at.isoformat(),
+            'assignee_id': self.assignee_id,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'due_at': self.due_at.isoformat() if self.due_at else None,
+            'escalated_at': self.escalated_at.isoformat() if self.escalated_at else None,
+            'duplicate_of': self.duplicate_of,
+            'comment_count': self.comment_count,
+            'last_activity_at': self.last_activity_at.isoformat() if self.last_activity_at else None,
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None
+        }
+    
+class TicketEvent(db.Model):
+    """
+    Append-only change feed of tickets, written in the same transaction as the change.
+    The id is the feed cursor, so ids must never be reused once compaction deleted them.
+    """
+    __table_args__ = (db.Index('ix_ticket_event_ticket_id_id', 'ticket_id', 'id'), {'sqlite_autoincrement': True})
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(20), nullable=False) # created, updated, deleted, archived
+    payload = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    
+    @staticmethod
+    def record(ticket, action):
+        db.session.flush()
+        event = TicketEvent(
+            ticket_id=ticket.id,
+            action=action,
+            payload=json.dumps(ticket.serialize()) if action not in ('deleted', 'archived') else None,
+        )
+        db.session.add(event)
+        return event
+    
+    @staticmethod
+    def compact(retention_days=7):
+        """
+        Drop events superseded by a later event for the same ticket, and tombstones older than
+        `retention_days`. Only the dropped tombstones lose information, so the newest of them is
+        kept as the watermark: readers with a cursor below it must resync from the start.
+        """
+        latest = db.session.query(db.func.max(TicketEvent.id)).group_by(TicketEvent.ticket_id)
+        superseded = TicketEvent.query.filter(TicketEvent.id.notin_(latest.scalar_subquery()))\
+            .delete(synchronize_session=False)
+        tombstones = TicketEvent.query.filter(
+            TicketEvent.action.in_(['deleted', 'archived']),
+            TicketEvent.created_at < datetime.now() - timedelta(days=retention_days),
+        )
+        dropped_through = tombstones.with_entities(db.func.max(TicketEvent.id)).scalar()
+        expired = 0
+        if dropped_through is not None:
+            expired = tombstones.filter(TicketEvent.id <= dropped_through).delete(synchronize_session=False)
+            watermark = db.session.get(TicketEventWatermark, 1) or TicketEventWatermark(id=1, dropped_through=0)
+            watermark.dropped_through = max(watermark.dropped_through, dropped_through)
+            watermark.updated_at = datetime.now()
+            db.session.add(watermark)
+        db.session.commit()
+        return superseded + expired
+    
+    @staticmethod
+    def watermark():
+        """Id of the newest tombstone dropped by compaction, 0 if none was."""
+        return db.session.query(TicketEventWatermark.dropped_through).filter_by(id=1).scalar() or 0
+    
+    def __repr__(self):
+        return f'<TicketEvent {self.id}: {self.action} {self.ticket_id}>'
+    
+    def serialize(self):
+        return {
+            'id': self.id,
+            'ticket_id': self.ticket_id,
+            'action': self.action,
+            'ticket': json.loads(self.payload) if self.payload else None,
+            'created_at': self.created_at.isoformat()
+        }
+    
+
+class TicketEventWatermark(db.Model):
+    """Single row: how far TicketEvent.compact() dropped tombstones from the change feed."""
+    id = db.Column(db.Integer, primary_key=True)
+    dropped_through = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class TicketComment(db.Model):
+    __table_args__ = (db.Index('ix_ticket_comment_ticket_id_id', 'ticket_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    
+    @staticmethod
+    def add(ticket, author_id, body):
+        """
+        Add a comment and bump the ticket's comment_count and last_activity_at with a single
+        UPDATE ... SET comment_count = comment_count + 1, so concurrent comments never lose a count.
+        The caller owns the commit.
+        """
+        now = datetime.now()
+        comment = TicketComment(ticket_id=ticket.id, author_id=author_id, body=body, created_at=now)
+        db.session.add(comment)
+        db.session.execute(
+            db.update(Ticket).where(Ticket.id == ticket.id)
+            .values(comment_count=Ticket.comment_count + 1, last_activity_at=now)
+        )
+        return comment
+    
+    @staticmethod
+    def remove(comment):
+        """
+        Delete a comment and decrement the ticket's comment_count only if this call deleted the
+        row, so concurrent deletes of the same comment count it once. Returns whether it did.
+        The caller owns the commit.
+        """
+        deleted = TicketComment.query.filter_by(id=comment.id).delete(synchronize_session=False)
+        if deleted:
+            db.session.execute(
+                db.update(Ticket).where(Ticket.id == comment.ticket_id)
+                .values(comment_count=Ticket.comment_count - 1)
+            )
+        return bool(deleted)
+    
+    def __repr__(self):
+        return f'<TicketComment {self.id} on {self.ticket_id}>'
+    
+    def serialize(self):
+        return {
+            'id': self.id,
+            'ticket_id': self.ticket_id,
+            'author_id': self.author_id,
+            'body': self.body,
             'created_at': self.created_at.isoformat()
         }
+
+
+class TicketAttachment(db.Model):
+    """A file attached to a ticket. Content lives in the attachment store under its sha256."""
+    __table_args__ = (
+        db.Index('ix_ticket_attachment_ticket_id', 'ticket_id'),
+        db.Index('ix_ticket_attachment_sha256', 'sha256'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    
+    def __repr__(self):
+        return f'<TicketAttachment {self.id}: {self.filename}>'
     
+    def serialize(self):
+        return {
+            'id': self.id,
+            'ticket_id': self.ticket_id,
+            'uploaded_by': self.uploaded_by,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'created_at': self.created_at.isoformat()
+        }
+
+
 class AuthenticationLog(db.Model):
+    __table_args__ = (
+        db.Index('ix_authentication_log_timestamp', 'timestamp'),
+        db.Index('ix_authentication_log_event_timestamp', 'event', 'timestamp'),
+        db.Index('ix_authentication_log_ip_address_timestamp', 'ip_address', 'timestamp'),
+        db.Index('ix_authentication_log_user_id_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_authentication_log_username_timestamp', 'username', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     username = db.Column(db.String(64), nullable=True)
-    event = db.Column(db.String(20), nullable=False)
+    event = db.Column(db.String(32), nullable=False)
     ip_address = db.Column(db.String(45), nullable=True)
     user_agent = db.Column(db.String(255), nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.now())
+    timestamp = db.Column(db.DateTime, default=datetime.now)
     user = db.relationship('User', backref=db.backref('authentication_logs', lazy=True))
     
     def __repr__(self):
@@ -137,4 +404,74 @@ class PushNotification(db.Model):
             'p256dh': self.p256dh,
             'auth': self.auth
         }
-    
\ No newline at end of file
+
+
+class KnownLoginSource(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'ip_address', name='uq_known_login_source_user_ip'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    ip_address = db.Column(db.String(45), nullable=False)
+    user_agent = db.Column(db.String(255), nullable=True)
+    last_seen_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    
+    def __repr__(self):
+        return f'<KnownLoginSource {self.user_id}: {self.ip_address}>'
+
+
+class RevokedToken(db.Model):
+    """
+    Revoked JWTs, kept until the token would have expired anyway. Workers mirror the table
+    in memory (see utils/revocation.py) and follow it by revoked_at.
+    """
+    __table_args__ = (
+        db.Index('ix_revoked_token_expires_at', 'expires_at'),
+        db.Index('ix_revoked_token_revoked_at', 'revoked_at'),
+        {'sqlite_autoincrement': True},
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=False, unique=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    
+    @staticmethod
+    def purge_expired():
+        deleted = RevokedToken.query.filter(RevokedToken.expires_at < datetime.now()).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}: {self.token_type} of {self.user_id}>'
+
+
+class IdempotencyKey(db.Model):
+    """
+    First response to a request carrying an Idempotency-Key header, replayed for retries until
+    expires_at (see utils/idempotency.py). completed_at is NULL while the first request runs;
+    locked_until lets a retry take over when that request died without finishing.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_key_scope_key'),
+        db.Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(64), nullable=False) # user the key belongs to
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False) # sha256 of method, path and body
+    locked_until = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    response_status = db.Column(db.Integer, nullable=True)
+    response_headers = db.Column(db.Text, nullable=True) # JSON list of [name, value]
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    @staticmethod
+    def purge_expired():
+        deleted = IdempotencyKey.query.filter(IdempotencyKey.expires_at < datetime.now()).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.scope}: {self.key}>'
@@ -1,28 +1,48 @@
-from flask import render_template
+from flask import render_template, send_file
+from werkzeug.utils import secure_filename
 from flask_restful import Resource, reqparse
-from .models import db, Ticket, User
+from datetime import datetime, timedelta
+
+from flask import request, current_app
+from .models import db, Ticket, User, TicketEvent, TicketAttachment, TicketComment
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .utils.utils import role_required
 from . import limiter
 from .mailer import send_email
 from .utils.rate_limit_utils import rate_limit_per_role
-from .utils.ai_utils import generate_ticket_suggestion
+from .utils.pagination import encode_cursor, decode_cursor, page_limit
+from .utils.sla import sla_due_at
+from .utils.attachments import AttachmentTooLarge, get_attachment_store
+from .utils.archive import get_ticket_archive
+from .utils.coalescing import coalesced, public_scope
+from .utils.idempotency import idempotent
 from . import socketio
 
 ticket_parser = reqparse.RequestParser()
 ticket_parser.add_argument('title', type=str, required=True, help='Title is required')
 ticket_parser.add_argument('description', type=str, required=True, help='Description is required')
 ticket_parser.add_argument('status', type=str, choices=['open', 'closed', 'in_progress'], default='open', help='Status must be open, closed, or in_progress')
-ticket_parser.add_argument('priority', type=str, choices=['low', 'medium', 'high'], default='medium', help='Priority must be low, medium, or high')
+ticket_parser.add_argument('priority', type=str, choices=['low', 'medium', 'high'], help='Priority must be low, medium, or high')
 
 class TicketListResource(Resource):
     @staticmethod
     @jwt_required()
     @limiter.limit(rate_limit_per_role)
+    @coalesced()
     def get():
         """
         Get all tickets
         ---
+        parameters:
+            - in: query
+              name: sort
+              type: string
+              enum: [created, activity]
+              default: created
+              description: activity lists the most recently updated or commented tickets first
+            - in: query
+              name: limit
+              type: integer
         responses:
             200:
                 description: List of all tickets
@@ -30,13 +50,19 @@ class TicketListResource(Resource):
                     type: array
                     
         """
-        tickets = Ticket.query.all()
-        return [tickets.serialize() for t in tickets], 200
+        query = Ticket.query
+        if request.args.get('sort') == 'activity':
+            query = query.order_by(Ticket.last_activity_at.desc(), Ticket.id.desc())
+        if request.args.get('limit'):
+            query = query.limit(page_limit(request.args['limit'], maximum=1000))
+        tickets = query.all()
+        return [t.serialize() for t in tickets], 200
     
     @staticmethod
     @jwt_required()
     @role_required(['consumer'])
     @limiter.limit(rate_limit_per_role)
+    @idempotent
     def post():
         """
         Create a new ticket
@@ -57,31 +83,58 @@ class TicketListResource(Resource):
                     enum: [open, closed, in_progress]
                   priority:
                     type: string
-                    default: medium
+                    description: predicted by the local classifier when omitted
                     enum: [low, medium, high]
                 required: [title, description]
         responses:
             201:
-                description: Created ticket
+                description: Created ticket and the open tickets it likely duplicates
         """
         args = ticket_parser.parse_args()
         
-        if not args['title'] or not args['description']:
-            args['title'], args['description'] = generate_ticket_suggestion(args.get('title', '') + ' ' + args.get('description', ''))
+        priority_source = 'user'
+        if not args['priority']:
+            from .utils.triage import predict_triage
+            triage = predict_triage(args['title'], args['description'])
+            args['priority'] = triage['priority'] if triage else 'medium'
+            priority_source = 'triage'
         identity = get_jwt_identity()
         user = User.query.get(identity['id'])
-        ticket = Ticket(title=args['title'], description=args['description'], status=args['status'], priority=args['priority'])
+        ticket = Ticket(title=args['title'], description=args['description'], status=args['status'],
+                        priority=args['priority'], priority_source=priority_source)
+        ticket.due_at = sla_due_at(ticket)
+        
+        # NumPy-backed utils are imported on first use, not by create_app()
+        from .utils.duplicates import find_duplicates, get_duplicate_index
+        from .utils.retrieval import index_ticket
+        signature, duplicates = find_duplicates(ticket.title, ticket.description)
+        ticket.minhash = signature.tobytes()
+        autolink = current_app.config['DUPLICATE_AUTOLINK_THRESHOLD']
+        if duplicates and autolink is not None and duplicates[0][1] >= autolink:
+            ticket.duplicate_of = duplicates[0][0].id
+        
         db.session.add(ticket)
+        TicketEvent.record(ticket, 'created')
         db.session.commit()
+        get_duplicate_index().add(ticket.id, signature)
+        index_ticket(ticket)
+        
+        # Send email notification, the original ticket already notified for linked duplicates
+        if not ticket.duplicate_of:
+            subject = f'New Ticket: {args["title"]}'
+            body = render_template('new_ticket_notification.html', ticket=ticket, username=user.username)
+            send_email(subject, user.email, body)
         
-        # Send email notification
-        subject = f'New Ticket: {args["title"]}'
-        body = render_template('new_ticket_notification.html', ticket=ticket, username=user['username'])
-        send_email(subject, user.email, body)
-        return ticket.serialize(), 201
+        result = ticket.serialize()
+        result['duplicates'] = [
+            {'id': duplicate.id, 'title': duplicate.title, 'similarity': round(similarity, 2)}
+            for duplicate, similarity in duplicates
+        ]
+        return result, 201
     
 class TicketResource(Resource):
     @staticmethod
+    @coalesced(public_scope)
     def get(ticket_id):
         """
         Get a single ticket
@@ -99,8 +152,14 @@ class TicketResource(Resource):
         """
         ticket = Ticket.query.get(ticket_id)
         if not ticket:
-            return {'message': 'Ticket not found'}, 404
-        return ticket.serialize(), 200
+            # Closed tickets are moved to cold storage after ARCHIVE_AFTER_DAYS but stay readable
+            archived = get_ticket_archive().get(ticket_id)
+            if archived is None:
+                return {'message': 'Ticket not found'}, 404
+            return archived, 200
+        result = ticket.serialize()
+        result['attachments'] = [attachment.serialize() for attachment in ticket.attachments]
+        return result, 200
     
     @staticmethod
     @jwt_required()
@@ -115,7 +174,7 @@ class TicketResource(Resource):
                 schema:
                     type: object
         """
-        user_id = get_jwt_identity()
+        user_id = get_jwt_identity()['id']
         ticket = Ticket.query.get(ticket_id)
         if not ticket:
             return {'message': 'Ticket not found'}, 404
@@ -123,25 +182,33 @@ class TicketResource(Resource):
         args = ticket_parser.parse_args()
         ticket.title = args['title']
         ticket.description = args['description']
+        previous = (ticket.status, ticket.priority)
         ticket.status = args.get('status', ticket.status)
-        ticket.priority = args.get('priority', ticket.priority)
+        if args['priority']:
+            ticket.priority, ticket.priority_source = args['priority'], 'user'
+        if (ticket.status, ticket.priority) != previous:
+            ticket.due_at = sla_due_at(ticket)
+        ticket.last_activity_at = datetime.now()
         
         user = User.query.get(user_id)
         
         if user:
             subject = f'Ticket Update: {ticket.title}'
-            body = render_template('ticket_update_notification.html', ticket=ticket, username=user['username'])
+            body = render_template('ticket_update_notification.html', ticket=ticket, username=user.username)
             send_email(subject, user.email, body)
         
+        TicketEvent.record(ticket, 'updated')
         db.session.commit()
+        from .utils.retrieval import index_ticket
+        index_ticket(ticket)
         # emit event to update ticket list
-        socketio.emit('ticket_updated', ticket.serialize(), broadcoast=True)
+        socketio.emit('ticket_updated', ticket.serialize())
         return ticket.serialize(), 200
     
     @staticmethod
     @jwt_required()
     @role_required(['engineer'])
-    def delete(self, ticket_id):
+    def delete(ticket_id):
         """
         Delete a ticket by ID
         ---
@@ -157,6 +224,424 @@ class TicketResource(Resource):
         ticket = Ticket.query.get(ticket_id)
         if not ticket:
             return {'message': 'Ticket not found'}, 404
+        TicketEvent.record(ticket, 'deleted')
+        TicketComment.query.filter_by(ticket_id=ticket.id).delete(synchronize_session=False)
+        # Tickets marked as duplicates of this one would point at a missing row
+        for duplicate in Ticket.query.filter_by(duplicate_of=ticket.id):
+            duplicate.duplicate_of = None
+            TicketEvent.record(duplicate, 'updated')
         db.session.delete(ticket)
         db.session.commit()
-        return {'message': 'Ticket deleted successfully'}, 200
\ No newline at end of file
+        from .utils.retrieval import unindex_ticket
+        unindex_ticket(ticket_id)
+        return {'message': 'Ticket deleted successfully'}, 200
+
+
+class TicketChangeListResource(Resource):
+    @staticmethod
+    @jwt_required()
+    @limiter.limit(rate_limit_per_role)
+    def get():
+        """
+        Get ticket changes since a cursor
+        ---
+        parameters:
+            - in: query
+              name: since
+              type: string
+              description: next_cursor of the previous call, omit for a full sync
+            - in: query
+              name: limit
+              type: integer
+              default: 500
+        responses:
+            200:
+                description: Ticket changes in feed order and the cursor to resume from
+            410:
+                description: Cursor is older than the feed retention, resync without a cursor
+        """
+        limit = page_limit(request.args.get('limit'), default=500, maximum=5000)
+        query = TicketEvent.query
+        
+        since = request.args.get('since')
+        if since:
+            try:
+                event_id, created_at = decode_cursor(since, int, str)
+            except ValueError:
+                return {'message': 'Invalid cursor'}, 400
+            # Only a tombstone dropped after the cursor makes it miss something; a quiet feed does not
+            if event_id < TicketEvent.watermark():
+                return {'message': 'Cursor expired, resync without a cursor'}, 410
+            query = query.filter(TicketEvent.id > event_id)
+        
+        events = query.order_by(TicketEvent.id).limit(limit + 1).all()
+        has_more = len(events) > limit
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1].id, events[-1].created_at) if events else since
+        return {'changes': [e.serialize() for e in events], 'next_cursor': next_cursor, 'has_more': has_more}, 200
+
+
+class TicketClaimResource(Resource):
+    @staticmethod
+    @jwt_required()
+    @role_required(['engineer'])
+    @idempotent
+    def post():
+        """
+        Claim the next most urgent unclaimed open ticket
+        ---
+        responses:
+            200:
+                description: Claimed ticket, leased until lease_expires_at
+            204:
+                description: No ticket is waiting
+        """
+        engineer_id = get_jwt_identity()['id']
+        ticket = Ticket.claim_next(engineer_id, current_app.config['TICKET_CLAIM_LEASE_MINUTES'])
+        if not ticket:
+            db.session.rollback()
+            return '', 204
+        TicketEvent.record(ticket, 'updated')
+        db.session.commit()
+        return ticket.serialize(), 200
+
+
+class TicketLeaseResource(Resource):
+    @staticmethod
+    @jwt_required()
+    @role_required(['engineer'])
+    def post(ticket_id):
+        """
+        Renew the lease on a claimed ticket
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+        responses:
+            200:
+                description: Ticket with its extended lease
+            409:
+                description: Ticket is not claimed by the caller
+        """
+        engineer_id = get_jwt_identity()['id']
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return {'message': 'Ticket not found'}, 404
+        if not ticket.is_claimed_by(engineer_id):
+            return {'message': 'Ticket is not claimed by you'}, 409
+        
+        ticket.lease_expires_at = datetime.now() + timedelta(minutes=current_app.config['TICKET_CLAIM_LEASE_MINUTES'])
+        TicketEvent.record(ticket, 'updated')
+        db.session.commit()
+        return ticket.serialize(), 200
+    
+    @staticmethod
+    @jwt_required()
+    @role_required(['engineer'])
+    def delete(ticket_id):
+        """
+        Release a claimed ticket back to the queue
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+        responses:
+            200:
+                description: Ticket released
+            409:
+                description: Ticket is not claimed by the caller
+        """
+        engineer_id = get_jwt_identity()['id']
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return {'message': 'Ticket not found'}, 404
+        if not ticket.is_claimed_by(engineer_id):
+            return {'message': 'Ticket is not claimed by you'}, 409
+        
+        ticket.assignee_id = None
+        ticket.lease_expires_at = None
+        TicketEvent.record(ticket, 'updated')
+        db.session.commit()
+        return ticket.serialize(), 200
+
+
+class TicketCommentListResource(Resource):
+    @staticmethod
+    @jwt_required()
+    @limiter.limit(rate_limit_per_role)
+    def get(ticket_id):
+        """
+        Get a page of a ticket's comments, oldest first
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+            - in: query
+              name: cursor
+              type: string
+            - in: query
+              name: limit
+              type: integer
+              default: 50
+        responses:
+            200:
+                description: Comments and the cursor of the next page
+        """
+        if not db.session.query(Ticket.id).filter_by(id=ticket_id).first():
+            return {'message': 'Ticket not found'}, 404
+        limit = page_limit(request.args.get('limit'))
+        query = TicketComment.query.filter_by(ticket_id=ticket_id)
+        if request.args.get('cursor'):
+            try:
+                after_id, = decode_cursor(request.args['cursor'], int)
+            except ValueError:
+                return {'message': 'Invalid cursor'}, 400
+            query = query.filter(TicketComment.id > after_id)
+        
+        comments = query.order_by(TicketComment.id).limit(limit + 1).all()
+        next_cursor = encode_cursor(comments[limit - 1].id) if len(comments) > limit else None
+        return {'comments': [comment.serialize() for comment in comments[:limit]], 'next_cursor': next_cursor}, 200
+    
+    @staticmethod
+    @jwt_required()
+    @limiter.limit(rate_limit_per_role)
+    @idempotent
+    def post(ticket_id):
+        """
+        Comment on a ticket
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+            - in: body
+              name: comment
+              schema:
+                type: object
+                properties:
+                  body:
+                    type: string
+                required: [body]
+        responses:
+            201:
+                description: Created comment
+        """
+        data = request.get_json(silent=True) or {}
+        body = (data.get('body') or '').strip()
+        if not body:
+            return {'message': 'Body is required'}, 400
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return {'message': 'Ticket not found'}, 404
+        
+        comment = TicketComment.add(ticket, get_jwt_identity()['id'], body)
+        TicketEvent.record(ticket, 'updated')
+        db.session.commit()
+        return comment.serialize(), 201
+
+
+class TicketCommentResource(Resource):
+    @staticmethod
+    @jwt_required()
+    def delete(ticket_id, comment_id):
+        """
+        Delete a comment
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+            - in: path
+              name: comment_id
+              type: integer
+        responses:
+            200:
+                description: Comment deleted
+            403:
+                description: Only engineers, admins and the author can delete a comment
+        """
+        identity = get_jwt_identity()
+        comment = TicketComment.query.filter_by(id=comment_id, ticket_id=ticket_id).first()
+        if not comment:
+            return {'message': 'Comment not found'}, 404
+        if identity['role'] not in ('engineer', 'admin') and comment.author_id != identity['id']:
+            return {'message': 'Unauthorized'}, 403
+        
+        if not TicketComment.remove(comment):
+            # Deleted by a concurrent request
+            return {'message': 'Comment not found'}, 404
+        TicketEvent.record(Ticket.query.get(ticket_id), 'updated')
+        db.session.commit()
+        return {'message': 'Comment deleted successfully'}, 200
+
+
+class TicketAttachmentListResource(Resource):
+    @staticmethod
+    @jwt_required()
+    @limiter.limit(rate_limit_per_role)
+    def get(ticket_id):
+        """
+        List the attachments of a ticket (metadata only)
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+        responses:
+            200:
+                description: Attachment metadata, oldest first
+        """
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return {'message': 'Ticket not found'}, 404
+        return [attachment.serialize() for attachment in ticket.attachments], 200
+    
+    @staticmethod
+    @jwt_required()
+    @limiter.limit(rate_limit_per_role)
+    def post(ticket_id):
+        """
+        Attach a file to a ticket
+        ---
+        consumes:
+            - application/octet-stream
+            - multipart/form-data
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+            - in: query
+              name: filename
+              type: string
+              description: required when the file is sent as the raw request body
+            - in: formData
+              name: file
+              type: file
+              description: alternatively, the file as a multipart form field
+        responses:
+            201:
+                description: Attachment metadata
+            413:
+                description: File larger than ATTACHMENT_MAX_BYTES
+        """
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return {'message': 'Ticket not found'}, 404
+        store = get_attachment_store()
+        if request.content_length and store.exceeds_limit(request.content_length):
+            return {'message': 'Attachment too large'}, 413
+        
+        # A raw body is streamed straight to the store; multipart uploads are spooled by Werkzeug first
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if not upload:
+                return {'message': 'Missing file'}, 400
+            filename, content_type, stream = upload.filename, upload.mimetype, upload.stream
+        else:
+            filename, content_type, stream = request.args.get('filename'), request.mimetype, request.stream
+        filename = secure_filename(filename or '')
+        if not filename:
+            return {'message': 'Missing filename'}, 400
+        
+        try:
+            sha256, size = store.save(stream)
+        except AttachmentTooLarge:
+            return {'message': 'Attachment too large'}, 413
+        attachment = TicketAttachment(
+            ticket_id=ticket.id,
+            uploaded_by=get_jwt_identity()['id'],
+            filename=filename,
+            content_type=content_type or 'application/octet-stream',
+            size=size,
+            sha256=sha256,
+        )
+        db.session.add(attachment)
+        db.session.commit()
+        return attachment.serialize(), 201
+
+
+class TicketAttachmentResource(Resource):
+    @staticmethod
+    @jwt_required()
+    @limiter.limit(rate_limit_per_role)
+    def get(ticket_id, attachment_id):
+        """
+        Download an attachment
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+            - in: path
+              name: attachment_id
+              type: integer
+            - in: header
+              name: Range
+              type: string
+              required: false
+        responses:
+            200:
+                description: File content
+            206:
+                description: Requested byte range
+            304:
+                description: Not modified (If-None-Match on the sha256 ETag)
+        """
+        attachment = TicketAttachment.query.filter_by(id=attachment_id, ticket_id=ticket_id).first()
+        if attachment:
+            attachment = attachment.serialize()
+        else:
+            # Archived tickets keep their attachment metadata and blobs
+            archived = get_ticket_archive().get(ticket_id)
+            attachment = next((attachment for attachment in (archived or {}).get('attachments', [])
+                               if attachment['id'] == attachment_id), None)
+            if not attachment:
+                return {'message': 'Attachment not found'}, 404
+        # Content never changes for a given sha256; USE_X_SENDFILE hands the file to the proxy
+        response = send_file(
+            get_attachment_store().path(attachment['sha256']),
+            mimetype=attachment['content_type'],
+            as_attachment=True,
+            download_name=attachment['filename'],
+            conditional=True,
+            etag=attachment['sha256'],
+            last_modified=datetime.fromisoformat(attachment['created_at']),
+            max_age=31536000,
+        )
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+    
+    @staticmethod
+    @jwt_required()
+    def delete(ticket_id, attachment_id):
+        """
+        Remove an attachment from a ticket
+        ---
+        parameters:
+            - in: path
+              name: ticket_id
+              type: integer
+            - in: path
+              name: attachment_id
+              type: integer
+        responses:
+            200:
+                description: Attachment removed
+            403:
+                description: Only engineers, admins and the uploader can remove an attachment
+        """
+        identity = get_jwt_identity()
+        attachment = TicketAttachment.query.filter_by(id=attachment_id, ticket_id=ticket_id).first()
+        if not attachment:
+            return {'message': 'Attachment not found'}, 404
+        if identity['role'] not in ('engineer', 'admin') and attachment.uploaded_by != identity['id']:
+            return {'message': 'Unauthorized'}, 403
+        # The stored file is shared by identical uploads and collected by the scheduler once unreferenced
+        db.session.delete(attachment)
+        db.session.commit()
+        return {'message': 'Attachment removed successfully'}, 200
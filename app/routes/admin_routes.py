@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import db, User, AuthenticationLog
@@ -5,6 +7,7 @@ from ..utils.utils import role_required
 from .. import limiter
 from ..logger import clean_old_logs
 from ..utils.rate_limit_utils import rate_limit_per_role
+from ..utils.pagination import encode_cursor, decode_cursor, page_limit, prefix_range, estimate_row_count
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -14,17 +17,118 @@ admin_bp = Blueprint('admin', __name__)
 @role_required(['admin'])
 def get_users():
     """
-    Get all users
+    Get a page of users
     ---
+    parameters:
+        - in: query
+          name: q
+          type: string
+          description: Username or email prefix
+        - in: query
+          name: role
+          type: string
+          enum: [consumer, engineer, admin]
+        - in: query
+          name: locked
+          type: boolean
+        - in: query
+          name: cursor
+          type: string
+        - in: query
+          name: limit
+          type: integer
+          default: 50
     responses:
         200:
-            description: List of all users
+            description: Users ordered by id, the cursor of the next page and, when no filter
+                is given, an estimate of the total number of users
     """
     identity = get_jwt_identity()
     if identity.get('role')!= 'admin':
         return jsonify({'error': 'Not authorized to access this resource'}), 403
-    users = User.query.all()
-    return [user.serialize() for user in users], 200
+    
+    limit = page_limit(request.args.get('limit'))
+    query = User.query
+    
+    if request.args.get('cursor'):
+        try:
+            after_id, = decode_cursor(request.args['cursor'], int)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(User.id > after_id)
+    
+    filtered = any(request.args.get(name) is not None for name in ('q', 'role', 'locked'))
+    prefix = request.args.get('q', '').strip()
+    if prefix:
+        query = query.filter(db.or_(prefix_range(User.username, prefix), prefix_range(User.email, prefix)))
+    
+    if request.args.get('role'):
+        query = query.filter(User.role == request.args['role'])
+    
+    locked = request.args.get('locked')
+    if locked is not None:
+        now = datetime.now()
+        if locked.lower() in ('1', 'true', 'yes'):
+            query = query.filter(User.locked_until > now)
+        else:
+            query = query.filter(db.or_(User.locked_until.is_(None), User.locked_until <= now))
+    
+    users = query.order_by(User.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(users[limit - 1].id) if len(users) > limit else None
+    page = {'users': [user.serialize() for user in users[:limit]], 'next_cursor': next_cursor}
+    # The estimate covers the whole table; counting a filtered set would be the scan it avoids
+    if not filtered:
+        page['total'] = estimate_row_count(User)
+    return page, 200
+
+
+@admin_bp.route('/users/import', methods=['POST'])
+@jwt_required()
+@role_required(['admin'])
+@limiter.limit(rate_limit_per_role)
+def import_users():
+    """
+    Create users in bulk from a CSV or NDJSON upload
+    ---
+    consumes:
+        - text/csv
+        - application/x-ndjson
+        - multipart/form-data
+    parameters:
+        - in: query
+          name: format
+          type: string
+          enum: [csv, ndjson]
+          description: defaults to the content type, or the extension of the uploaded file
+        - in: formData
+          name: file
+          type: file
+          description: alternatively, the file as a multipart form field
+    responses:
+        200:
+            description: Number of users created and the errors of the rejected rows
+    """
+    from ..utils.user_import import UserImportError, import_users as run_import
+    
+    # A raw body is parsed as it arrives; multipart uploads are spooled by Werkzeug first
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'error': 'Missing file'}), 400
+        stream, name = upload.stream, upload.filename or ''
+        guessed = 'csv' if name.lower().endswith('.csv') else 'ndjson'
+    else:
+        stream = request.stream
+        guessed = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+    format = request.args.get('format', guessed)
+    if format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Invalid format'}), 400
+    
+    try:
+        report = run_import(stream, format)
+    except UserImportError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report), 200
 
 
 @admin_bp.route('/users/<int:user_id>', methods=['PUT'])
@@ -78,14 +182,66 @@ def delete_user(user_id):
 @role_required(['admin'])
 def get_logs():
     """
-    Get all authentication logs
+    Get a page of authentication logs
     ---
+    parameters:
+        - in: query
+          name: user_id
+          type: integer
+        - in: query
+          name: username
+          type: string
+        - in: query
+          name: event
+          type: string
+        - in: query
+          name: ip_address
+          type: string
+        - in: query
+          name: since
+          type: string
+          format: date-time
+        - in: query
+          name: until
+          type: string
+          format: date-time
+        - in: query
+          name: cursor
+          type: string
+        - in: query
+          name: limit
+          type: integer
+          default: 100
     responses:
         200:
-            description: List of all authentication logs in descending order of timestamp
+            description: Matching authentication logs in descending order of timestamp and the cursor of the next page
+        400:
+            description: Invalid filter or cursor
     """
-    logs = AuthenticationLog.query.order_by(AuthenticationLog.timestamp.desc()).all()
-    return [log.serialize() for log in logs], 200
+    limit = page_limit(request.args.get('limit'), default=100, maximum=1000)
+    query = AuthenticationLog.query
+    
+    for field in ('username', 'event', 'ip_address'):
+        if request.args.get(field):
+            query = query.filter(getattr(AuthenticationLog, field) == request.args[field])
+    
+    try:
+        if request.args.get('user_id'):
+            query = query.filter(AuthenticationLog.user_id == int(request.args['user_id']))
+        if request.args.get('since'):
+            query = query.filter(AuthenticationLog.timestamp >= datetime.fromisoformat(request.args['since']))
+        if request.args.get('until'):
+            query = query.filter(AuthenticationLog.timestamp < datetime.fromisoformat(request.args['until']))
+        if request.args.get('cursor'):
+            timestamp, log_id = decode_cursor(request.args['cursor'], str, int)
+            query = query.filter(
+                db.tuple_(AuthenticationLog.timestamp, AuthenticationLog.id) < (datetime.fromisoformat(timestamp), log_id))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid user_id, time range or cursor'}), 400
+    
+    logs = query.order_by(AuthenticationLog.timestamp.desc(), AuthenticationLog.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(logs[limit - 1].timestamp, logs[limit - 1].id) if len(logs) > limit else None
+    return {'logs': [log.serialize() for log in logs[:limit]], 'next_cursor': next_cursor}, 200
 
 
 @admin_bp.route('/clean_logs', methods=['POST'])
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from .. import limiter
+from ..utils.rate_limit_utils import rate_limit_per_role
+from ..utils.ai_utils import generate_ticket_suggestion
+from ..utils.triage import predict_triage
+from ..utils.chatbot import generate_chatbot_response
+
+ai_bp = Blueprint('ai', __name__)
+
+
+@ai_bp.route('/ai_generate_ticket', methods=['POST'])
+@jwt_required()
+@limiter.limit(rate_limit_per_role)
+def ai_generate_ticket():
+    """
+    Suggest a ticket from an issue summary: priority and status come from the local
+    classifier, title and description are rewritten by the LLM only when enrichment is on
+    ---
+    parameters:
+        - in: body
+          name: suggestion
+          schema:
+            type: object
+            properties:
+              issue_summary:
+                type: string
+              enrich:
+                type: boolean
+            required: [issue_summary]
+    responses:
+        200:
+            description: Ticket suggestion generated successfully
+    """
+    data = request.get_json()
+    if not data or not data.get('issue_summary'):
+        return jsonify({'error': 'Missing issue summary'}), 400
+    
+    summary = data['issue_summary']
+    title, description = summary.split('\n', 1)[0][:100], summary
+    triage = predict_triage(title, description) or {'priority': 'medium', 'status': 'open'}
+    priority, status = triage['priority'], triage['status']
+    
+    if data.get('enrich', current_app.config['TRIAGE_LLM_ENRICHMENT']):
+        title, _, _, description = generate_ticket_suggestion(summary)
+    return jsonify({'title': title, 'priority': priority, 'status': status, 'description': description}), 200
+
+
+@ai_bp.route('/chatbot', methods=['POST'])
+@jwt_required()
+@limiter.limit(rate_limit_per_role)
+def chatbot():
+    """
+    Generate a response from a chatbot using the provided message
+    ---
+    responses:
+        200:
+            description: Chatbot response generated successfully
+    """
+    data = request.get_json()
+    if not data or not data.get('message'):
+        return jsonify({'error': 'Missing message'}), 400
+    
+    response = generate_chatbot_response(data['message'])
+    return jsonify({'response': response}), 200
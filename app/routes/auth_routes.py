@@ -1,93 +1,19 @@
-import json
-
 from flask import Blueprint, request, jsonify, render_template, url_for, send_file, current_app
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
-from ..models import db, User, PushNotification, Ticket
+from flask_jwt_extended import (
+    create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt, decode_token
+)
+from ..models import db, User
 from .. import limiter
 from ..mailer import send_email
-from ..utils.qr_utils import generate_qrcode
-from ..logger import log_auth_event
+from ..logger import log_auth_event, record_auth_event, notify_admin_on_suspicious_event
 from ..utils.rate_limit_utils import rate_limit_per_role
-from ..utils.ai_utils import generate_ticket_suggestion
 from ..utils.utils import role_required
-from ..utils.chatbot import generate_chatbot_response
-from flask_cors import cross_origin
-from pywebpush import webpush, WebPushException
-from .. import socketio
+from ..utils.startup import subsystem_enabled
+from ..utils.revocation import revoke_token
 
 auth_bp = Blueprint('auth', __name__)
 
 
-@auth_bp.route('/subscribe', methods=['POST'])
-@jwt_required()
-@cross_origin()
-def subscribe():
-    """
-    Subscribe to push notifications
-    ---
-    responses:
-        200:
-            description: Subscription successful
-    """
-    data = request.get_json()
-    user_id = get_jwt_identity()["id"]
-    
-    if not data or not data.get('endpoint') or not data.get('keys'):
-        return jsonify({'error': 'Missing endpoint or keys'}), 400
-    
-    push_notification = PushNotification.query.filter_by(endpoint=data['endpoint']).first()
-    if not push_notification:
-        push_notification = PushNotification(
-            user_id=user_id,
-            endpoint=data['endpoint'],
-            p256h=data['keys']['p256dh'],
-            auth=data['keys']['auth']
-        )
-        db.session.add(push_notification)
-    else:
-        push_notification.p256h = data['keys']['p256dh']
-        push_notification.auth = data['keys']['auth']
-    db.session.commit()
-    
-    return jsonify({'message': 'Subscription successful'}), 200
-
-
-def send_notification(user_id, title, message):
-    push_notification = PushNotification.query.filter_by(user_id=user_id).first()
-    
-    payload = {"title": title, "body": message}
-    
-    for push in push_notification:
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": push.endpoint,
-                    "keys": {
-                        "p256dh": push.p256h,
-                        "auth": push.auth
-                    }
-                },
-                data=json.dumps(payload),
-                vapid_private_key=current_app.config['VAPID_PRIVATE_KEY'],
-                vapid_claims={
-                    "sub": current_app.config['VAPID_CLAIM_EMAIL']
-                },
-                ttl=10800  # 3 hours
-            )
-        except WebPushException as e:
-            print(f"Failed to send notification to {push.endpoint}: {e}")
-
-
-@socketio.on('ticket_updated')
-def ticket_updated_event(ticket_data):
-    ticket_id = ticket_data.get('ticket_id')
-    ticket = Ticket.query.get(ticket_id)
-    
-    if ticket:
-        send_notification(ticket.user_id, f'Ticket Updated: {ticket.title}',
-                          f'Your ticket {ticket.title} has been updated to {ticket.status}.')
-
-
 @auth_bp.route('/register', methods=['POST'])
 @jwt_required()
 @limiter.limit(rate_limit_per_role)
@@ -117,10 +43,12 @@ def register():
     db.session.commit()
     
     # Generate QR code
-    qrcode_uri = user.get_qrcode_uri()
-    qrcode_img = generate_qrcode(qrcode_uri)
-    
-    send_file(qrcode_img, mimetype='image/png')
+    if subsystem_enabled('qr'):
+        from ..utils.qr_utils import generate_qrcode
+        qrcode_uri = user.get_qrcode_uri()
+        qrcode_img = generate_qrcode(qrcode_uri)
+        
+        send_file(qrcode_img, mimetype='image/png')
     
     # Send email confirmation
     subject = 'Registration Confirmation'
@@ -150,26 +78,34 @@ def login():
         log_auth_event(user, 'LOGIN_ATTEMPT_LOCKED')
         return jsonify({'error': 'Account is locked'}), 403
     
-    if not user or not user.check_password(data['password']):
-        if user:
-            user.failed_attempts += 1
-            if user.failed_attempts >= 3:
-                user.lock()
-                log_auth_event(user, 'ACCOUNT_LOCKED')
-                subject = 'Account Locked'
-                body = render_template('account_locked.html', username=user.username)
-                send_email(subject, user.email, body)
-                return jsonify({'error': 'Too many failed login attempts'}), 403
-            db.session.commit()
-            log_auth_event(user, 'LOGIN_FAILURE')
-        else:
-            log_auth_event(None, 'LOGIN_FAILURE_UNKNOWN_USER')
+    if not user:
+        log_auth_event(None, 'LOGIN_FAILURE_UNKNOWN_USER')
         return jsonify({'error': 'Invalid username or password'}), 401
     
-    user.failed_attempts = 0
-    db.session.commit()
+    if not user.check_password(data['password']):
+        # Count the attempt, decide the lockout and log it in one transaction
+        locked = User.record_failed_login(
+            user.id,
+            max_attempts=current_app.config['MAX_FAILED_LOGIN_ATTEMPTS'],
+            lock_minutes=current_app.config['ACCOUNT_LOCK_MINUTES'],
+        )
+        event = {None: 'LOGIN_ATTEMPT_LOCKED', True: 'ACCOUNT_LOCKED', False: 'LOGIN_FAILURE'}[locked]
+        record_auth_event(user, event)
+        db.session.commit()
+        notify_admin_on_suspicious_event(user, event)
+        
+        if locked is None:
+            return jsonify({'error': 'Account is locked'}), 403
+        if locked:
+            subject = 'Account Locked'
+            body = render_template('account_locked.html', username=user.username)
+            send_email(subject, user.email, body)
+            return jsonify({'error': 'Too many failed login attempts'}), 403
+        return jsonify({'error': 'Invalid username or password'}), 401
     
-    log_auth_event(user, 'LOGIN_SUCCESS')
+    User.reset_failed_logins(user.id)
+    record_auth_event(user, 'LOGIN_SUCCESS')
+    db.session.commit()
     return jsonify({'message': 'Login successful'}), 200
 
 
@@ -184,9 +120,44 @@ def refresh():
             description: Access and refresh tokens generated successfully
     
     """
+    # Refresh tokens are single use: the presented one is revoked and replaced
     current_user_id = get_jwt_identity()
+    if not revoke_token(get_jwt()):
+        # Another request just used the same refresh token
+        return jsonify({'error': 'Token has been revoked'}), 401
+    db.session.commit()
     new_access_token = create_access_token(identity=current_user_id)
-    return jsonify({'access_token': new_access_token}), 200
+    new_refresh_token = create_refresh_token(identity=current_user_id)
+    return jsonify({'access_token': new_access_token, 'refresh_token': new_refresh_token}), 200
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """
+    Revoke the presented token, and the refresh token given in the body if any
+    ---
+    responses:
+        200:
+            description: Tokens revoked successfully
+        400:
+            description: Invalid refresh token
+    """
+    payload = get_jwt()
+    revoke_token(payload)
+    data = request.get_json(silent=True) or {}
+    if data.get('refresh_token'):
+        try:
+            refresh_payload = decode_token(data['refresh_token'])
+        except Exception:
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        if refresh_payload['type'] != 'refresh' or refresh_payload['sub'] != payload['sub']:
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        if refresh_payload['jti'] != payload['jti']:
+            revoke_token(refresh_payload)
+    record_auth_event(User.query.get(payload['sub']['id']), 'LOGOUT')
+    db.session.commit()
+    return jsonify({'message': 'Logged out successfully'}), 200
 
 
 @auth_bp.route('/me', methods=['GET'])
@@ -391,41 +362,3 @@ def unlock_account():
     user.unlock()
     log_auth_event(user, 'ACCOUNT_UNLOCKED')
     return jsonify({'message': 'Account unlocked successfully'}), 200
-
-
-@auth_bp.route('/ai_generate_ticket', methods=['POST'])
-@jwt_required()
-@limiter.limit(rate_limit_per_role)
-def ai_generate_ticket():
-    """
-    Generate a ticket using AI-powered suggestion
-    ---
-    responses:
-        200:
-            description: Ticket suggestion generated successfully
-    """
-    data = request.get_json()
-    if not data or not data.get('issue_summary'):
-        return jsonify({'error': 'Missing issue summary'}), 400
-    
-    title, priority, status, description = generate_ticket_suggestion(data['issue_summary'])
-    return jsonify({'title': title, 'priority': priority, 'status': status, 'description': description}), 200
-
-
-@auth_bp.route('/chatbot', methods=['POST'])
-@jwt_required()
-@limiter.limit(rate_limit_per_role)
-def chatbot():
-    """
-    Generate a response from a chatbot using the provided message
-    ---
-    responses:
-        200:
-            description: Chatbot response generated successfully
-    """
-    data = request.get_json()
-    if not data or not data.get('message'):
-        return jsonify({'error': 'Missing message'}), 400
-    
-    response = generate_chatbot_response(data['message'])
-    return jsonify({'response': response}), 200
@@ -0,0 +1,84 @@
+import json
+import logging
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_cors import cross_origin
+from ..models import db, PushNotification, Ticket
+from .. import socketio
+
+push_bp = Blueprint('push', __name__)
+logger = logging.getLogger(__name__)
+
+
+@push_bp.route('/subscribe', methods=['POST'])
+@jwt_required()
+@cross_origin()
+def subscribe():
+    """
+    Subscribe to push notifications
+    ---
+    responses:
+        200:
+            description: Subscription successful
+    """
+    data = request.get_json()
+    user_id = get_jwt_identity()["id"]
+    
+    if not data or not data.get('endpoint') or not data.get('keys'):
+        return jsonify({'error': 'Missing endpoint or keys'}), 400
+    
+    push_notification = PushNotification.query.filter_by(endpoint=data['endpoint']).first()
+    if not push_notification:
+        push_notification = PushNotification(
+            user_id=user_id,
+            endpoint=data['endpoint'],
+            p256h=data['keys']['p256dh'],
+            auth=data['keys']['auth']
+        )
+        db.session.add(push_notification)
+    else:
+        push_notification.p256h = data['keys']['p256dh']
+        push_notification.auth = data['keys']['auth']
+    db.session.commit()
+    
+    return jsonify({'message': 'Subscription successful'}), 200
+
+
+def send_notification(user_id, title, message):
+    from pywebpush import webpush, WebPushException
+    
+    push_notification = PushNotification.query.filter_by(user_id=user_id).first()
+    
+    payload = {"title": title, "body": message}
+    
+    for push in push_notification:
+        try:
+            webpush(
+                subscription_info={
+                    "endpoint": push.endpoint,
+                    "keys": {
+                        "p256dh": push.p256h,
+                        "auth": push.auth
+                    }
+                },
+                data=json.dumps(payload),
+                vapid_private_key=current_app.config['VAPID_PRIVATE_KEY'],
+                vapid_claims={
+                    "sub": current_app.config['VAPID_CLAIM_EMAIL']
+                },
+                ttl=10800  # 3 hours
+            )
+        except WebPushException as e:
+            logger.warning('Failed to send notification to %s: %s', push.endpoint, e,
+                           extra={'user_id': user_id, 'endpoint': push.endpoint})
+
+
+@socketio.on('ticket_updated')
+def ticket_updated_event(ticket_data):
+    ticket_id = ticket_data.get('ticket_id')
+    ticket = Ticket.query.get(ticket_id)
+    
+    if ticket:
+        send_notification(ticket.user_id, f'Ticket Updated: {ticket.title}',
+                          f'Your ticket {ticket.title} has been updated to {ticket.status}.')
@@ -1,17 +1,71 @@
+import logging
 import schedule
 import time
 
-from run import app
+from . import create_app, db
 from .logger import clean_old_logs
+from .models import TicketEvent, RevokedToken, TicketAttachment, IdempotencyKey
+from .utils.sla import EscalationEngine
+from .utils.attachments import get_attachment_store
+from .utils.archive import archive_closed_tickets, get_ticket_archive
+from .utils.triage import train_triage_model
 
-def schedule_clean_old_logs():
+app = create_app()
+logger = logging.getLogger(__name__)
+
+def schedule_clean_old_logs(days=30):
+    with app.app_context():
+        clean_old_logs(days)  # Clean old logs every 30 days
+
+def schedule_compact_ticket_events():
+    with app.app_context():
+        TicketEvent.compact(app.config['TICKET_CHANGES_RETENTION_DAYS'])
+
+def schedule_purge_revoked_tokens():
+    with app.app_context():
+        RevokedToken.purge_expired()
+
+def schedule_purge_idempotency_keys():
     with app.app_context():
-        clean_old_logs()  # Clean old logs every 30 days
+        IdempotencyKey.purge_expired()
+
+def schedule_collect_attachment_garbage():
+    with app.app_context():
+        referenced = {sha256 for sha256, in db.session.query(TicketAttachment.sha256).distinct()}
+        referenced |= get_ticket_archive().archived_attachments()
+        get_attachment_store().collect_garbage(referenced)
+
+def schedule_archive_closed_tickets():
+    with app.app_context():
+        while archive_closed_tickets(app.config['ARCHIVE_AFTER_DAYS'], app.config['ARCHIVE_BATCH_SIZE']):
+            pass
+
+def schedule_train_triage_model():
+    with app.app_context():
+        try:
+            count, report = train_triage_model()
+        except Exception:
+            logger.exception('Training the triage model failed')
+            return
+        logger.info('Triage model trained on %d tickets', count,
+                    extra={f'{target}_accuracy': round(accuracy, 3) for target, (accuracy, _) in report.items()})
+
+escalation_engine = EscalationEngine(app)
 
 schedule.every().day.at("00:00").do(schedule_clean_old_logs, days=30)
+schedule.every().hour.do(schedule_compact_ticket_events)
+schedule.every().hour.do(schedule_purge_revoked_tokens)
+schedule.every().hour.do(schedule_purge_idempotency_keys)
+schedule.every().day.at("02:30").do(schedule_archive_closed_tickets)
+schedule.every().day.at("03:00").do(schedule_collect_attachment_garbage)
+schedule.every(app.config['SLA_TICK_SECONDS']).seconds.do(escalation_engine.tick)
+schedule.every().sunday.at("02:00").do(schedule_train_triage_model)
 
 def run_scheduler():
     while True:
         schedule.run_pending()
         time.sleep(1)
-        
\ No newline at end of file
+        
+
+if __name__ == '__main__':
+    run_scheduler()
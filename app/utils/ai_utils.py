@@ -1,8 +1,9 @@
-import openai
 from flask import current_app
 
 def generate_ticket_suggestion(user_input):
-    openai.api_key = current_app['OPENAI_API_KEY']
+    import openai
+    
+    openai.api_key = current_app.config['OPENAI_API_KEY']
     
     prompt = f"""
     The user is requesting a new support ticket with the following description: {user_input}.
@@ -22,6 +23,6 @@ def generate_ticket_suggestion(user_input):
     )
     
     ai_response = response.choices[0]["message"]["content"].strip()
-    title, priority, status, description = ai_response.split("\n", 1)
+    title, priority, status, description = ai_response.split("\n", 3)
     
     return title, priority, status, description.strip()
@@ -0,0 +1,149 @@
+import functools
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from .. import db
+from ..models import Ticket, TicketAttachment, TicketComment, TicketEvent
+
+
+class TicketArchive:
+    """
+    Cold storage for closed tickets. Each archival run writes one immutable segment of
+    gzip'd NDJSON (one ticket per line, with its comments and attachment metadata). Lines
+    are compressed in blocks of `block_size` tickets, each block a separate gzip member, so
+    the file still reads with zcat while a single ticket only needs its block decompressed.
+    index.db (SQLite) maps ticket id -> (segment, block offset, block length) and lists the
+    attachment contents archived tickets still reference.
+    """
+    def __init__(self, path, block_size=64):
+        self.path = path
+        self.block_size = block_size
+        os.makedirs(path, exist_ok=True)
+        with self._index() as index:
+            index.execute('CREATE TABLE IF NOT EXISTS archived_ticket ('
+                          'id INTEGER PRIMARY KEY, segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)')
+            index.execute('CREATE TABLE IF NOT EXISTS archived_attachment (sha256 TEXT PRIMARY KEY)')
+
+    def _index(self):
+        connection = sqlite3.connect(os.path.join(self.path, 'index.db'), timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def write_segment(self, records):
+        """Write (ticket_id, record) pairs to a new segment and index them. Returns the segment name."""
+        segment = datetime.now().strftime('segment-%Y%m%d%H%M%S%f.ndjson.gz')
+        tmp = os.path.join(self.path, f'.{segment}.tmp')
+        entries = []
+        with open(tmp, 'wb') as f:
+            for start in range(0, len(records), self.block_size):
+                block = records[start:start + self.block_size]
+                compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+                member = compressor.compress(''.join(json.dumps(record) + '\n' for _, record in block).encode())
+                member += compressor.flush()
+                offset = f.tell()
+                f.write(member)
+                entries.extend((ticket_id, segment, offset, len(member)) for ticket_id, _ in block)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, segment))
+
+        blobs = {(attachment['sha256'],) for _, record in records for attachment in record['attachments']}
+        with self._index() as index:
+            index.executemany('INSERT OR REPLACE INTO archived_ticket VALUES (?, ?, ?, ?)', entries)
+            index.executemany('INSERT OR IGNORE INTO archived_attachment VALUES (?)', blobs)
+        return segment
+
+    def get(self, ticket_id):
+        with self._index() as index:
+            row = index.execute('SELECT segment, offset, length FROM archived_ticket WHERE id = ?', (ticket_id,)).fetchone()
+        if row is None:
+            return None
+        for line in self._read_block(*row).splitlines():
+            record = json.loads(line)
+            if record['id'] == ticket_id:
+                return record
+        return None
+
+    @functools.lru_cache(maxsize=32)
+    def _read_block(self, segment, offset, length):
+        with open(os.path.join(self.path, segment), 'rb') as f:
+            f.seek(offset)
+            return zlib.decompress(f.read(length), 31)
+
+    def archived_attachments(self):
+        with self._index() as index:
+            return {sha256 for sha256, in index.execute('SELECT sha256 FROM archived_attachment')}
+
+
+def get_ticket_archive():
+    archive = current_app.extensions.get('ticket_archive')
+    if archive is None:
+        archive = current_app.extensions.setdefault('ticket_archive', TicketArchive(
+            current_app.config['ARCHIVE_PATH'], current_app.config['ARCHIVE_BLOCK_SIZE']))
+    return archive
+
+
+def archive_closed_tickets(older_than_days, batch_size=5000):
+    """
+    Move one batch of tickets closed more than `older_than_days` ago out of the hot tables
+    into a new archive segment. The batch is first locked by an UPDATE that re-checks the
+    conditions (row locks on PostgreSQL, the write lock on SQLite), so a ticket reopened or
+    commented on since it was selected is left alone, and what is archived is read under that
+    lock. The segment is durable before the rows are deleted, so a crash in between only
+    leaves tickets in both places until the next run. Tickets that an unarchived open ticket
+    points to as duplicate_of stay until that one is archived too; closed ones lose the link
+    (it would dangle), which stays in the archived record as `duplicates`.
+    Returns the number of tickets archived.
+    """
+    from .retrieval import get_retrieval_index
+
+    referrer = db.aliased(Ticket)
+    archivable = (
+        Ticket.status == 'closed',
+        Ticket.closed_at < datetime.now() - timedelta(days=older_than_days),
+        ~db.exists().where(referrer.duplicate_of == Ticket.id, referrer.status != 'closed'),
+    )
+    batch = db.select(Ticket.id).where(*archivable).order_by(Ticket.id).limit(batch_size)
+    ids = db.session.execute(
+        db.update(Ticket).where(Ticket.id.in_(batch.scalar_subquery()), *archivable)
+        .values(closed_at=Ticket.closed_at).returning(Ticket.id),
+        execution_options={'synchronize_session': False},
+    ).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return 0
+    ids.sort()
+    tickets = Ticket.query.filter(Ticket.id.in_(ids)).order_by(Ticket.id).populate_existing().all()
+
+    comments, attachments, duplicates = {}, {}, {}
+    for comment in TicketComment.query.filter(TicketComment.ticket_id.in_(ids)).order_by(TicketComment.id):
+        comments.setdefault(comment.ticket_id, []).append(comment.serialize())
+    for attachment in TicketAttachment.query.filter(TicketAttachment.ticket_id.in_(ids)).order_by(TicketAttachment.id):
+        attachments.setdefault(attachment.ticket_id, []).append(attachment.serialize())
+    unlinked = Ticket.query.filter(Ticket.duplicate_of.in_(ids), Ticket.id.notin_(ids)).all()
+    for ticket in unlinked:
+        duplicates.setdefault(ticket.duplicate_of, []).append(ticket.id)
+    records = []
+    for ticket in tickets:
+        record = ticket.serialize()
+        record['comments'] = comments.get(ticket.id, [])
+        record['attachments'] = attachments.get(ticket.id, [])
+        record['duplicates'] = duplicates.get(ticket.id, [])
+        records.append((ticket.id, record))
+    get_ticket_archive().write_segment(records)
+
+    TicketComment.query.filter(TicketComment.ticket_id.in_(ids)).delete(synchronize_session=False)
+    TicketAttachment.query.filter(TicketAttachment.ticket_id.in_(ids)).delete(synchronize_session=False)
+    for ticket in unlinked:
+        ticket.duplicate_of = None
+        TicketEvent.record(ticket, 'updated')
+    Ticket.query.filter(Ticket.id.in_(ids)).delete(synchronize_session=False)
+    db.session.add_all([TicketEvent(ticket_id=ticket_id, action='archived') for ticket_id in ids])
+    db.session.commit()
+    get_retrieval_index().remove(*ids)
+    return len(ids)
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from flask import current_app
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class AttachmentStore:
+    """
+    Content-addressed file store: every distinct content is written once, at
+    <root>/<sha[:2]>/<sha[2:4]>/<sha>. Uploads are hashed while they are copied to a
+    temporary file in chunks and then renamed into place, or dropped if the content
+    is already stored.
+    """
+    def __init__(self, root, chunk_size=64 * 1024, max_bytes=None):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+    
+    def exceeds_limit(self, size):
+        return self.max_bytes is not None and size > self.max_bytes
+    
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+    
+    def save(self, stream):
+        """Copy a file-like object into the store and return its (sha256, size)."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, 'tmp'))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while chunk := stream.read(self.chunk_size):
+                    size += len(chunk)
+                    if self.exceeds_limit(size):
+                        raise AttachmentTooLarge(f'Attachment exceeds {self.max_bytes} bytes')
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            target = self.path(sha256)
+            if os.path.exists(target):
+                # Same content already stored; touching it keeps it out of the next collection
+                os.utime(target)
+                os.unlink(tmp)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp, target)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+    
+    def collect_garbage(self, referenced, min_age=3600):
+        """
+        Remove stored files whose sha256 is not in `referenced` and that were not written or
+        deduplicated against in the last `min_age` seconds, so uploads still being committed are kept.
+        """
+        removed = 0
+        cutoff = time.time() - min_age
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if name not in referenced and os.stat(path).st_mtime < cutoff:
+                    os.unlink(path)
+                    removed += 1
+        return removed
+
+
+def get_attachment_store():
+    store = current_app.extensions.get('attachment_store')
+    if store is None:
+        store = current_app.extensions.setdefault('attachment_store', AttachmentStore(
+            current_app.config['ATTACHMENTS_PATH'],
+            chunk_size=current_app.config['ATTACHMENT_CHUNK_SIZE'],
+            max_bytes=current_app.config['ATTACHMENT_MAX_BYTES'],
+        ))
+    return store
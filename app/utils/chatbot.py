@@ -1,11 +1,12 @@
-import openai
 from flask import current_app
-from ..models import Ticket
+from .retrieval import search_tickets
 
 def generate_chatbot_response(user_input):
-    openai.api_key = current_app['OPENAI_API_KEY']
+    import openai
     
-    relevant_tickets = Ticket.query.filter(Ticket.description.ilike(f"%{user_input}%")).limit(5).all()
+    openai.api_key = current_app.config['OPENAI_API_KEY']
+    
+    relevant_tickets = search_tickets(user_input, current_app.config['CHATBOT_CONTEXT_TICKETS'])
     relevant_ticket_titles = "\n".join([f"-{t.title}: {t.description}" for t in relevant_tickets])
     
     prompt = f"""
@@ -0,0 +1,110 @@
+import json
+import threading
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from werkzeug.wrappers import Response as ResponseBase
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs a function once per key among concurrent callers: the first caller computes the
+    result and the ones arriving while it is in flight wait for it and share it. Nothing
+    is cached afterwards. Waiters that time out or see the leader fail compute their own.
+    """
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.computed = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+        if not leader:
+            if call.done.wait(self.timeout) and call.error is None:
+                self.shared += 1
+                return call.result
+            return fn()
+        try:
+            call.result = fn()
+            self.computed += 1
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+def get_single_flight():
+    single_flight = current_app.extensions.get('single_flight')
+    if single_flight is None:
+        single_flight = current_app.extensions.setdefault(
+            'single_flight', SingleFlight(current_app.config['REQUEST_COALESCING_TIMEOUT']))
+    return single_flight
+
+
+def role_scope():
+    identity = get_jwt_identity()
+    return identity.get('role') if identity else None
+
+
+def user_scope():
+    identity = get_jwt_identity()
+    return identity.get('id') if identity else None
+
+
+def public_scope():
+    return None
+
+
+def render_result(rv):
+    """Serialize a Flask-RESTful return value once, as (body, status, headers)."""
+    if isinstance(rv, ResponseBase):
+        return rv.get_data(), rv.status_code, list(rv.headers.items())
+    data, status, headers = rv, 200, None
+    if isinstance(rv, tuple):
+        data, status, headers = (rv + (200, None)[len(rv) - 1:])[:3]
+    return (json.dumps(data) + '\n').encode(), status, list((headers or {}).items())
+
+
+def build_response(body, status, headers):
+    """The response for a render_result() triple, which may be shared by several requests."""
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    for name, value in headers:
+        if name.lower() != 'content-length':
+            response.headers[name] = value
+    return response
+
+
+def coalesced(scope=role_scope):
+    """
+    Share one execution and its serialized body between identical concurrent GETs. Requests
+    are identical when they hit the same endpoint with the same path and query string and
+    `scope()` returns the same value, so place this below the auth decorators and pick a
+    scope that separates callers who may see different data (role, user, or public).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['REQUEST_COALESCING_ENABLED']:
+                return f(*args, **kwargs)
+            key = (request.endpoint, request.full_path, scope())
+            return build_response(*get_single_flight().do(key, lambda: render_result(f(*args, **kwargs))))
+        return wrapper
+    return decorator
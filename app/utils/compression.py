@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from .coalescing import SingleFlight
+
+# Streamed output is flushed to the client at least this often (in uncompressed bytes)
+STREAM_FLUSH_BYTES = 16 * 1024
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'application/xml')
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class CompressionCache:
+    """LRU of compressed bodies keyed by (digest of the body, encoding), bounded by total bytes."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.entries or len(value) > self.max_bytes:
+                return
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class Compression:
+    """
+    Negotiated gzip/brotli compression of JSON and text responses in an after_request hook.
+    Buffered bodies below COMPRESSION_MIN_SIZE are left alone; larger ones are compressed
+    once per distinct body and encoding and kept in an LRU, so a hot payload served to many
+    clients (e.g. a coalesced ticket list) is not compressed again for each of them.
+    Streamed responses are compressed as they are produced, with a flush every STREAM_FLUSH_BYTES.
+    """
+    def __init__(self, app=None):
+        self.single_flight = SingleFlight()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['COMPRESSION_ENABLED']
+        self.min_size = app.config['COMPRESSION_MIN_SIZE']
+        self.levels = app.config['COMPRESSION_LEVELS']
+        self.encodings = [encoding for encoding in app.config['COMPRESSION_ENCODINGS']
+                          if encoding != 'br' or _brotli() is not None]
+        self.cache = CompressionCache(app.config['COMPRESSION_CACHE_BYTES'])
+        app.extensions['compression'] = self
+        app.after_request(self.compress_response)
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return _brotli().compress(body, quality=self.levels['br'])
+        return gzip.compress(body, compresslevel=self.levels['gzip'], mtime=0)
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            compressor = _brotli().Compressor(quality=self.levels['br'])
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.levels['gzip'], zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    def compress_cached(self, body, encoding):
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            # Concurrent requests for the same payload wait for one compression instead of all compressing it
+            compressed = self.single_flight.do(key, lambda: self.compress(body, encoding))
+            self.cache.put(key, compressed)
+        return compressed
+
+    def compress_stream(self, chunks, encoding):
+        process, flush, finish = self.compressor(encoding)
+        pending = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = process(chunk)
+                pending += len(chunk)
+                if pending >= STREAM_FLUSH_BYTES:
+                    data += flush()
+                    pending = 0
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def compress_response(self, response):
+        if not self.enabled or not self.encodings:
+            return response
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not (response.mimetype.startswith('text/') or response.mimetype in COMPRESSIBLE_MIMETYPES)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(self.compress_cached(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,203 @@
+import threading
+
+import numpy as np
+from flask import current_app
+
+from .. import db
+from ..models import Ticket, TicketEvent
+from .text_features import hashed_tokens, ticket_text
+
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+
+class MinHasher:
+    def __init__(self, num_perm, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """MinHash signature of the text, empty if it has no tokens (it would match every other such text)."""
+        hashes = np.unique(hashed_tokens(text) % MERSENNE_PRIME)
+        if not hashes.size:
+            return np.empty(0, dtype=np.uint32)
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index over open tickets. Signatures are stored on the ticket at insert time,
+    so (re)building only reads Ticket.minhash. New rows go to small per-band hash buckets
+    and are merged into sorted per-band key arrays (searched with searchsorted) every
+    `merge_every` inserts. Tickets created by other workers are picked up by id on each query;
+    tickets closed, deleted or archived anywhere are evicted by following the change feed
+    (rows in the sorted arrays are masked until the next merge), and reopened ones come back.
+    """
+    def __init__(self, bands, rows, merge_every=4096):
+        self.bands = bands
+        self.rows = rows
+        self.merge_every = merge_every
+        self.hasher = MinHasher(bands * rows)
+        self.multipliers = np.random.default_rng(2).integers(1, 1 << 63, rows, dtype=np.uint64) | np.uint64(1)
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.signatures = np.empty((0, self.bands * self.rows), dtype=np.uint32)
+        self.band_keys = [np.empty(0, dtype=np.uint64) for _ in range(self.bands)]
+        self.band_rows = [np.empty(0, dtype=np.int64) for _ in range(self.bands)]
+        self.pending = {}
+        self.pending_buckets = [{} for _ in range(self.bands)]
+        self.known = set()
+        self.evicted = set()
+        self.max_id = 0
+        self.event_cursor = None
+
+    def _keys(self, signatures):
+        banded = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (banded * self.multipliers).sum(axis=2, dtype=np.uint64)
+
+    def add(self, ticket_id, signature):
+        if not signature.size:
+            return
+        with self.lock:
+            self._add(ticket_id, signature)
+
+    def _add(self, ticket_id, signature):
+        if ticket_id in self.known:
+            return
+        self.known.add(ticket_id)
+        self.pending[ticket_id] = signature
+        for band, key in enumerate(self._keys(signature[None])[0]):
+            self.pending_buckets[band].setdefault(int(key), []).append(ticket_id)
+        if len(self.pending) >= self.merge_every:
+            self._merge()
+
+    def _remove(self, ticket_id):
+        if ticket_id not in self.known:
+            return
+        self.known.discard(ticket_id)
+        signature = self.pending.pop(ticket_id, None)
+        if signature is None:
+            self.evicted.add(ticket_id)
+            if len(self.evicted) >= self.merge_every:
+                self._merge()
+            return
+        for band, key in enumerate(self._keys(signature[None])[0]):
+            bucket = self.pending_buckets[band][int(key)]
+            bucket.remove(ticket_id)
+            if not bucket:
+                del self.pending_buckets[band][int(key)]
+
+    def _merge(self):
+        if not self.pending and not self.evicted:
+            return
+        keep = ~np.isin(self.ids, np.fromiter(self.evicted, dtype=np.int64, count=len(self.evicted)))
+        self.ids = np.concatenate([self.ids[keep], np.fromiter(self.pending.keys(), dtype=np.int64)])
+        self.signatures = np.vstack([self.signatures[keep], *self.pending.values()])
+        keys = self._keys(self.signatures)
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind='stable')
+            self.band_keys[band] = keys[order, band]
+            self.band_rows[band] = order
+        self.pending = {}
+        self.pending_buckets = [{} for _ in range(self.bands)]
+        self.evicted = set()
+
+    def sync(self):
+        """
+        Index open tickets inserted since the last sync, including those from other workers,
+        and evict or restore the tickets that changed since then.
+        """
+        with self.lock:
+            if self.event_cursor is not None and self.event_cursor < TicketEvent.watermark():
+                # Compaction dropped tombstones this index never saw: start over
+                self._reset()
+            if self.event_cursor is None:
+                self.event_cursor = db.session.query(db.func.max(TicketEvent.id)).scalar() or 0
+            self._load_new()
+            self._apply_changes()
+
+    def _open_signatures(self, query):
+        width = self.bands * self.rows * 4
+        query = query.filter(Ticket.status != 'closed', Ticket.minhash.isnot(None))
+        return [(ticket_id, minhash) for ticket_id, minhash in query if len(minhash) == width]
+
+    def _load_new(self):
+        fetched = db.session.query(Ticket.id, Ticket.minhash).filter(Ticket.id > self.max_id).order_by(Ticket.id)
+        rows = self._open_signatures(fetched)
+        if not rows:
+            return
+        self.max_id = rows[-1][0]
+        rows = [(ticket_id, minhash) for ticket_id, minhash in rows if ticket_id not in self.known]
+        if len(rows) < self.merge_every:
+            for ticket_id, minhash in rows:
+                self._add(ticket_id, np.frombuffer(minhash, dtype=np.uint32))
+            return
+        # Bulk load (first sync after start): append straight to the sorted arrays
+        self._merge()
+        self.known.update(ticket_id for ticket_id, _ in rows)
+        self.pending = {ticket_id: np.frombuffer(minhash, dtype=np.uint32) for ticket_id, minhash in rows}
+        self._merge()
+
+    def _apply_changes(self):
+        changes = db.session.query(TicketEvent.id, TicketEvent.ticket_id)\
+            .filter(TicketEvent.id > self.event_cursor).order_by(TicketEvent.id).all()
+        if not changes:
+            return
+        self.event_cursor = changes[-1].id
+        changed = {change.ticket_id for change in changes}
+        still_open = dict(self._open_signatures(
+            db.session.query(Ticket.id, Ticket.minhash).filter(Ticket.id.in_(changed))))
+        for ticket_id in changed:
+            if ticket_id not in still_open:
+                self._remove(ticket_id)
+            elif ticket_id not in self.known and ticket_id <= self.max_id:
+                self._add(ticket_id, np.frombuffer(still_open[ticket_id], dtype=np.uint32))
+
+    def query(self, signature, threshold):
+        with self.lock:
+            keys = self._keys(signature[None])[0]
+            rows = []
+            candidates = {}
+            for band, key in enumerate(keys):
+                lo = np.searchsorted(self.band_keys[band], key, side='left')
+                hi = np.searchsorted(self.band_keys[band], key, side='right')
+                rows.append(self.band_rows[band][lo:hi])
+                for ticket_id in self.pending_buckets[band].get(int(key), ()):
+                    candidates[ticket_id] = float(np.mean(self.pending[ticket_id] == signature))
+            if rows:
+                rows = np.unique(np.concatenate(rows))
+                similarities = (self.signatures[rows] == signature).mean(axis=1)
+                candidates.update((ticket_id, similarity) for ticket_id, similarity
+                                  in zip(self.ids[rows].tolist(), similarities.tolist())
+                                  if ticket_id not in self.evicted)
+        matches = [(ticket_id, similarity) for ticket_id, similarity in candidates.items() if similarity >= threshold]
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+
+def get_duplicate_index():
+    index = current_app.extensions.get('duplicate_index')
+    if index is None:
+        index = current_app.extensions.setdefault('duplicate_index', DuplicateIndex(
+            current_app.config['DUPLICATE_LSH_BANDS'], current_app.config['DUPLICATE_LSH_ROWS']))
+    return index
+
+
+def find_duplicates(title, description, limit=5):
+    """
+    Return the MinHash signature of the ticket text and up to `limit` open tickets that
+    look like near-duplicates, as (ticket, estimated Jaccard similarity) pairs.
+    """
+    index = get_duplicate_index()
+    signature = index.hasher.signature(ticket_text(title, description))
+    if not signature.size:
+        return signature, []
+    index.sync()
+    matches = index.query(signature, current_app.config['DUPLICATE_SIMILARITY_THRESHOLD'])[:limit * 2]
+    if not matches:
+        return signature, []
+    tickets = {t.id: t for t in Ticket.query.filter(Ticket.id.in_([m[0] for m in matches]), Ticket.status != 'closed')}
+    return signature, [(tickets[ticket_id], similarity) for ticket_id, similarity in matches if ticket_id in tickets][:limit]
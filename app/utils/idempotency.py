@@ -0,0 +1,141 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import db
+from ..models import IdempotencyKey
+from .coalescing import build_response, render_result
+
+HEADER = 'Idempotency-Key'
+
+
+@event.listens_for(Session, 'after_commit')
+def _count_commit(session):
+    session.info['commits'] = session.info.get('commits', 0) + 1
+
+
+def _commits():
+    return db.session.info.get('commits', 0)
+
+
+def _scope():
+    identity = get_jwt_identity()
+    return f"user:{identity['id']}" if identity else f'ip:{request.remote_addr}'
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.full_path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _acquire(scope, key, fingerprint):
+    """
+    Insert the key for this request, or find out what to do with a repeat: replay the stored
+    response, wait for the request still running with it, or take it over if that request's
+    lock lapsed. Returns (record, None) when this request should run, (None, response) otherwise.
+    """
+    config = current_app.config
+    lock = timedelta(seconds=config['IDEMPOTENCY_LOCK_SECONDS'])
+    deadline = time.monotonic() + config['IDEMPOTENCY_WAIT_SECONDS']
+    while True:
+        now = datetime.now()
+        record = IdempotencyKey(scope=scope, key=key, fingerprint=fingerprint, locked_until=now + lock,
+                                expires_at=now + timedelta(hours=config['IDEMPOTENCY_TTL_HOURS']))
+        db.session.add(record)
+        try:
+            db.session.commit()
+            return record, None
+        except IntegrityError:
+            db.session.rollback()
+
+        existing = IdempotencyKey.query.filter_by(scope=scope, key=key).populate_existing().first()
+        if existing is None:
+            continue
+        if existing.expires_at < now:
+            IdempotencyKey.query.filter_by(id=existing.id).delete(synchronize_session=False)
+            db.session.commit()
+            continue
+        if existing.fingerprint != fingerprint:
+            return None, ({'message': f'{HEADER} was already used for a different request'}, 422)
+        if existing.completed_at is not None:
+            response = build_response(existing.response_body, existing.response_status,
+                                      json.loads(existing.response_headers))
+            response.headers['Idempotent-Replayed'] = 'true'
+            return None, response
+
+        taken = IdempotencyKey.query.filter(
+            IdempotencyKey.id == existing.id,
+            IdempotencyKey.completed_at.is_(None),
+            IdempotencyKey.locked_until < now,
+        ).update({IdempotencyKey.locked_until: now + lock}, synchronize_session=False)
+        db.session.commit()
+        if taken:
+            return existing, None
+        if time.monotonic() >= deadline:
+            return None, ({'message': f'A request with this {HEADER} is still in progress'}, 409, {'Retry-After': '1'})
+        time.sleep(config['IDEMPOTENCY_POLL_INTERVAL'])
+
+
+def idempotent(f):
+    """
+    Honour an Idempotency-Key header on a POST. The first response (below 500) is stored for
+    IDEMPOTENCY_TTL_HOURS and replayed, with Idempotent-Replayed: true, to retries carrying the
+    same key and body from the same user; a different body gets 422. A retry arriving while
+    the first request still runs waits for its response (across workers, through the table).
+    Errors and 5xx responses release the key so the next retry runs again, unless the handler
+    had already committed (e.g. indexing failed after the ticket was saved): then the 500 is
+    stored like any other response, as running the request again would repeat its effects.
+    The handler's own commit and the stored response are separate transactions: if the worker
+    dies between the two, a retry after IDEMPOTENCY_LOCK_SECONDS runs the request a second time.
+    Place below the auth decorators.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return {'message': f'{HEADER} must be at most 255 characters'}, 400
+
+        record, response = _acquire(_scope(), key, _fingerprint())
+        if response is not None:
+            return response
+        record_id = record.id
+        commits = _commits()
+        try:
+            body, status, headers = render_result(f(*args, **kwargs))
+        except BaseException:
+            db.session.rollback()
+            if _commits() == commits:
+                IdempotencyKey.query.filter_by(id=record_id).delete(synchronize_session=False)
+            else:
+                _complete(record_id, *render_result(({'message': 'Internal Server Error'}, 500)))
+            db.session.commit()
+            raise
+
+        if status >= 500 and _commits() == commits:
+            IdempotencyKey.query.filter_by(id=record_id).delete(synchronize_session=False)
+        else:
+            _complete(record_id, body, status, headers)
+        db.session.commit()
+        return build_response(body, status, headers)
+    return wrapper
+
+
+def _complete(record_id, body, status, headers):
+    IdempotencyKey.query.filter_by(id=record_id).update({
+        IdempotencyKey.completed_at: datetime.now(),
+        IdempotencyKey.locked_until: None,
+        IdempotencyKey.response_status: status,
+        IdempotencyKey.response_headers: json.dumps(headers),
+        IdempotencyKey.response_body: body,
+    }, synchronize_session=False)
@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+
+from flask import g, jsonify, request
+
+# Classes in the order they are shed; critical requests are always admitted
+SHED_ORDER = ('low', 'normal')
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+# WSGI environ key set by serve.py; clients cannot set it, unlike a header
+ACCEPTED_AT_KEY = 'serve.accepted_at'
+# A sample counts for at most this many windows, so one bogus timestamp cannot shed for long
+MAX_SAMPLE_WINDOWS = 3
+
+
+def parse_request_start(value):
+    """Parse an X-Request-Start header (t=<seconds>, <milliseconds> or <microseconds>) to epoch seconds."""
+    try:
+        start = float(value.strip().removeprefix('t='))
+    except (AttributeError, ValueError):
+        return None
+    if start > 1e14:
+        return start / 1e6
+    if start > 1e11:
+        return start / 1e3
+    return start
+
+
+class LoadShedder:
+    """
+    Admission control for one worker process. Every request is given a priority class from
+    LOAD_SHEDDING_CLASSES ('endpoint:METHOD', 'endpoint' or 'blueprint' keys; writes default
+    to critical, reads to normal). Latency is tracked as a time-decayed moving average of the
+    queueing delay: for the first request of a connection serve.py passes the time the master
+    accepted it, and behind a proxy the X-Request-Start header is used only if
+    LOAD_SHEDDING_TRUST_REQUEST_START says the proxy sets it (clients can send it too). Each
+    sample is clamped to a few windows. Service time is not used: slow handlers (SMTP,
+    password hashing, uploads, imports) are not overload. Above LOAD_SHEDDING_TARGET_MS or
+    LOAD_SHEDDING_MAX_IN_FLIGHT low requests get 503 + Retry-After, above twice either limit
+    normal ones do too. Without a timestamp only the in-flight limit applies.
+    """
+    def __init__(self, app=None):
+        self.latency = 0.0
+        self.observed_at = time.monotonic()
+        self.in_flight = 0
+        self.shed = dict.fromkeys(SHED_ORDER, 0)
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['LOAD_SHEDDING_ENABLED']
+        self.classes = app.config['LOAD_SHEDDING_CLASSES']
+        self.target = app.config['LOAD_SHEDDING_TARGET_MS'] / 1000
+        self.max_in_flight = app.config['LOAD_SHEDDING_MAX_IN_FLIGHT']
+        self.window = app.config['LOAD_SHEDDING_WINDOW_SECONDS']
+        self.trust_request_start = app.config['LOAD_SHEDDING_TRUST_REQUEST_START']
+        app.extensions['load_shedder'] = self
+        app.before_request(self.admit)
+        app.teardown_request(self.release)
+
+    def classify(self):
+        for key in (f'{request.endpoint}:{request.method}', request.endpoint, request.blueprint):
+            if key in self.classes:
+                return self.classes[key]
+        return 'critical' if request.method in WRITE_METHODS else 'normal'
+
+    def queued_since(self):
+        accepted_at = request.environ.get(ACCEPTED_AT_KEY)
+        if accepted_at is not None:
+            return accepted_at
+        if self.trust_request_start:
+            return parse_request_start(request.headers.get('X-Request-Start'))
+        return None
+
+    def current_latency(self, now):
+        return self.latency * math.exp(-(now - self.observed_at) / self.window)
+
+    def observe(self, sample, now):
+        with self.lock:
+            # Exponential moving average that also decays towards zero while nothing is observed,
+            # so a burst that caused shedding does not keep shedding once traffic is gone
+            latency = self.current_latency(now)
+            self.latency = latency + 0.1 * (sample - latency)
+            self.observed_at = now
+
+    def overload_level(self, now):
+        latency = self.current_latency(now)
+        if latency > 2 * self.target or self.in_flight > 2 * self.max_in_flight:
+            return 2
+        if latency > self.target or self.in_flight > self.max_in_flight:
+            return 1
+        return 0
+
+    def admit(self):
+        if not self.enabled or request.endpoint is None:
+            return None
+        now = time.monotonic()
+        priority = self.classify()
+        queued_since = self.queued_since()
+        if queued_since is not None:
+            self.observe(min(max(time.time() - queued_since, 0.0), MAX_SAMPLE_WINDOWS * self.window), now)
+
+        level = self.overload_level(now)
+        if priority in SHED_ORDER[:level]:
+            self.shed[priority] += 1
+            response = jsonify({'error': 'Server is busy, please retry later'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(max(1, round(self.window)))
+            return response
+
+        with self.lock:
+            self.in_flight += 1
+        g.load_shedding = priority
+
+    def release(self, exc=None):
+        if g.pop('load_shedding', None) is None:
+            return
+        with self.lock:
+            self.in_flight -= 1
@@ -0,0 +1,182 @@
+import atexit
+import importlib
+import json
+import logging
+import logging.handlers
+import re
+import sys
+import time
+import traceback
+import uuid
+import zlib
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+# LogRecord attributes that are not user fields passed through `extra`
+RESERVED_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'request_id'}
+
+
+def _original(name):
+    """The unpatched module under eventlet, so the listener is a real thread the hub never waits on."""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('thread'):
+            return patcher.original(name)
+    return importlib.import_module(name)
+
+
+def _sampled(request_id, rate):
+    """Keep-or-drop decision shared by every record of a request, so sampled requests stay whole."""
+    return zlib.crc32(request_id.encode()) % 10000 < rate * 10000
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        entry.update((name, value) for name, value in vars(record).items() if name not in RESERVED_ATTRIBUTES)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs in the caller before enqueueing: tags records with the request's correlation id and
+    drops the ones below WARNING from loggers in `sample_rates` unless the request is sampled.
+    """
+    def __init__(self, sample_rates):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record):
+        request_id = g.get('request_id') if has_request_context() else None
+        record.request_id = request_id
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.sample_rates.get(record.name)
+        if rate is None:
+            return True
+        return _sampled(request_id, rate) if request_id else rate >= 1
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Never blocks the caller: records are dropped (and counted) when the queue is full, and
+    only the message interpolation and the traceback text are done before enqueueing; the
+    JSON encoding and the write happen on the listener thread.
+    """
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except self.full:
+            self.dropped += 1
+
+
+class PipelineListener(logging.handlers.QueueListener):
+    """QueueListener on a real thread even under eventlet, and safe to stop twice."""
+    def start(self):
+        self._thread = _original('threading').Thread(target=self._monitor, name='log-pipeline', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class LogPipeline:
+    """
+    Process-wide queue-based logging for the 'app' logger tree (app.logger and every module
+    logger under app): callers enqueue, one listener thread formats records as JSON lines
+    and writes them to stderr. Each request gets a correlation id (from X-Request-ID or
+    generated) that is attached to its records and echoed in the response. LOG_ACCESS adds
+    one 'app.access' record per request, sampled with the rest through LOG_SAMPLE_RATES.
+    """
+    def __init__(self, level, queue_size, sample_rates, stream=None):
+        queue = _original('queue')
+        self.queue = queue.Queue(queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.full = queue.Full
+        self.handler.addFilter(RequestContextFilter(sample_rates))
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter())
+        self.listener = PipelineListener(self.queue, output, respect_handler_level=True)
+        self.level = level
+        self.reported_drops = 0
+
+    def start(self):
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self.listener.stop()
+
+    def report_drops(self):
+        dropped = self.handler.dropped
+        if dropped > self.reported_drops:
+            logging.getLogger('app.logging').warning('%d log records dropped, the log queue was full',
+                                                     dropped - self.reported_drops)
+            self.reported_drops = dropped
+
+
+_pipeline = None
+
+
+def init_logging(app):
+    """Route the 'app' loggers through the pipeline (started by the first app of the process) and add request ids."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(app.config['LOG_LEVEL'], app.config['LOG_QUEUE_SIZE'], app.config['LOG_SAMPLE_RATES'])
+        logger = logging.getLogger('app')
+        logger.setLevel(_pipeline.level)
+        logger.addHandler(_pipeline.handler)
+        logger.propagate = False
+        _pipeline.start()
+    pipeline = _pipeline
+    app.logger.removeHandler(default_handler)
+    app.extensions['log_pipeline'] = pipeline
+    access = logging.getLogger('app.access')
+
+    @app.before_request
+    def assign_request_id():
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id is None:
+            return response
+        response.headers[REQUEST_ID_HEADER] = request_id
+        if app.config['LOG_ACCESS']:
+            # Server errors are logged as warnings so sampling never drops them
+            level = logging.WARNING if response.status_code >= 500 else logging.INFO
+            access.log(level, '%s %s %s', request.method, request.path, response.status_code, extra={
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+                'remote_addr': request.remote_addr,
+            })
+        pipeline.report_drops()
+        return response
@@ -0,0 +1,159 @@
+"""
+Helpers for Alembic revisions that must not lock large tables for the length of a backfill
+or an index build. Call them from upgrade()/downgrade() in place of a bare UPDATE or
+op.create_index:
+
+    from app.utils import online_migration
+
+    def upgrade():
+        user = sa.table('user', sa.column('id'), sa.column('failed_attempts'))
+        online_migration.backfill(user, {'failed_attempts': 0}, where=user.c.failed_attempts.is_(None))
+
+Each batch is committed on its own, so a backfill should live in its own revision after
+the one that adds the column: if it is interrupted, `flask db upgrade` resumes it from the
+last checkpoint instead of replaying the DDL.
+"""
+import logging
+import time
+
+import sqlalchemy as sa
+from alembic import context, op
+from flask import current_app
+
+logger = logging.getLogger('alembic.online_migration')
+
+checkpoints = sa.Table(
+    'online_migration_checkpoint', sa.MetaData(),
+    sa.Column('name', sa.String(200), primary_key=True),
+    sa.Column('last_key', sa.BigInteger(), nullable=False),
+    sa.Column('rows_done', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+)
+
+
+def _load_checkpoint(connection, name):
+    checkpoints.create(connection, checkfirst=True)
+    row = connection.execute(sa.select(checkpoints.c.last_key, checkpoints.c.rows_done)
+                             .where(checkpoints.c.name == name)).first()
+    return tuple(row) if row else (None, 0)
+
+
+def _save_checkpoint(connection, name, last_key, rows_done):
+    values = {'last_key': last_key, 'rows_done': rows_done, 'updated_at': sa.func.now()}
+    if not connection.execute(checkpoints.update().where(checkpoints.c.name == name).values(values)).rowcount:
+        connection.execute(checkpoints.insert().values(name=name, **values))
+
+
+def _clear_checkpoint(connection, name):
+    connection.execute(checkpoints.delete().where(checkpoints.c.name == name))
+    # Dropped once unused so autogenerate never sees it as a table missing from the models
+    if connection.execute(sa.select(sa.func.count()).select_from(checkpoints)).scalar() == 0:
+        checkpoints.drop(connection)
+
+
+def backfill(table, values, where=None, key='id', name=None, batch_size=None, batch_seconds=None, pause=None):
+    """
+    UPDATE `table` SET `values` for the rows matching `where`, walking the integer `key`
+    column in ascending batches, each committed in its own transaction. The batch size adapts
+    so one batch takes about ONLINE_MIGRATION_BATCH_SECONDS, and the loop sleeps
+    ONLINE_MIGRATION_PAUSE_SECONDS between batches to leave room for the application.
+    Progress is checkpointed under `name` (the table and updated columns by default) so an
+    interrupted run resumes where it stopped; `values` must be safe to apply twice to the
+    last batch, since the update and its checkpoint are committed separately. In offline
+    (--sql) mode a single UPDATE is emitted. Returns the rows updated.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['ONLINE_MIGRATION_BATCH_SIZE']
+    batch_seconds = batch_seconds or config['ONLINE_MIGRATION_BATCH_SECONDS']
+    pause = config['ONLINE_MIGRATION_PAUSE_SECONDS'] if pause is None else pause
+    where = sa.true() if where is None else where
+    name = name or f'{table.name}:{",".join(sorted(values))}'
+    key_column = table.c[key]
+
+    if context.is_offline_mode():
+        op.execute(table.update().where(where).values(values))
+        return None
+
+    with context.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_key, rows_done = _load_checkpoint(connection, name)
+        remaining = connection.execute(sa.select(sa.func.count()).select_from(table).where(
+            where, key_column > last_key if last_key is not None else sa.true())).scalar()
+        logger.info('%s: %d rows to backfill%s', name, remaining,
+                    f' (resuming after {key} {last_key})' if last_key is not None else '')
+        started = reported = time.monotonic()
+        done = 0
+        while True:
+            batch_started = time.monotonic()
+            query = sa.select(key_column).where(where).order_by(key_column).limit(batch_size)
+            if last_key is not None:
+                query = query.where(key_column > last_key)
+            keys = connection.execute(query).scalars().all()
+            if not keys:
+                break
+            updated = connection.execute(table.update().where(
+                key_column.between(keys[0], keys[-1]), where).values(values)).rowcount
+            last_key, done = keys[-1], done + updated
+            _save_checkpoint(connection, name, last_key, rows_done + done)
+
+            elapsed = time.monotonic() - batch_started
+            if elapsed > 2 * batch_seconds:
+                batch_size = max(batch_size // 2, 1)
+            elif elapsed < batch_seconds / 2:
+                batch_size = min(batch_size * 2, config['ONLINE_MIGRATION_MAX_BATCH_SIZE'])
+            now = time.monotonic()
+            if now - reported >= 5:
+                rate = done / (now - started)
+                logger.info('%s: %d/%d rows, %.0f rows/s, about %.0fs left', name, done, remaining, rate,
+                            max(remaining - done, 0) / rate if rate else 0)
+                reported = now
+            time.sleep(pause)
+
+        _clear_checkpoint(connection, name)
+    logger.info('%s: %d rows backfilled in %.1fs', name, done, time.monotonic() - started)
+    return rows_done + done
+
+
+def _index_exists(connection, index_name, table_name):
+    return any(index['name'] == index_name for index in sa.inspect(connection).get_indexes(table_name))
+
+
+def create_index(index_name, table_name, columns, unique=False, **kw):
+    """
+    op.create_index that does not block writes: CONCURRENTLY on PostgreSQL (outside the
+    migration transaction; an invalid index left by an interrupted build is rebuilt), a plain
+    build elsewhere. Skips indexes that already exist so the revision can be re-run.
+    """
+    if context.is_offline_mode():
+        op.create_index(index_name, table_name, columns, unique=unique, **kw)
+        return
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        if not _index_exists(connection, index_name, table_name):
+            op.create_index(index_name, table_name, columns, unique=unique, **kw)
+        return
+    with context.get_context().autocommit_block():
+        valid = connection.execute(sa.text(
+            'SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name'),
+            {'name': index_name}).scalar()
+        if valid:
+            return
+        if valid is not None:
+            logger.info('%s: rebuilding invalid index', index_name)
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        op.create_index(index_name, table_name, columns, unique=unique, postgresql_concurrently=True, **kw)
+
+
+def drop_index(index_name, table_name):
+    """op.drop_index counterpart of create_index: CONCURRENTLY on PostgreSQL, skipped if already gone."""
+    if context.is_offline_mode():
+        op.drop_index(index_name, table_name=table_name)
+        return
+    connection = op.get_bind()
+    if not _index_exists(connection, index_name, table_name):
+        return
+    if connection.dialect.name != 'postgresql':
+        op.drop_index(index_name, table_name=table_name)
+        return
+    with context.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+
+from ..models import db
+
+
+def encode_cursor(*values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """
+    Decode a cursor produced by encode_cursor, raising ValueError if it is malformed or, when
+    `types` are given, does not hold exactly one value of each type
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    if types and (len(values) != len(types) or not all(
+            isinstance(value, kind) and not isinstance(value, bool) for value, kind in zip(values, types))):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_limit(value, default=50, maximum=200):
+    try:
+        limit = int(value) if value is not None else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def prefix_range(column, prefix):
+    # A range comparison lets a plain B-tree index serve the prefix match on every backend
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return db.and_(column >= prefix, column < upper)
+
+
+def estimate_row_count(model):
+    """
+    Cheap row count estimate from planner statistics (PostgreSQL, MySQL) instead of a full
+    COUNT(*) scan. SQLite keeps no such statistics and only backs small deployments, so it
+    gets an exact count.
+    """
+    table = model.__table__.name
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)'
+    elif dialect in ('mysql', 'mariadb'):
+        sql = 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = :table'
+    else:
+        return db.session.query(db.func.count()).select_from(model).scalar()
+    return max(db.session.execute(db.text(sql), {'table': table}).scalar() or 0, 0)
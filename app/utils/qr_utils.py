@@ -1,8 +1,9 @@
-import qrcode
 import io
 
 
 def generate_qrcode(uri):
+    import qrcode
+    
     qr = qrcode.make(uri)
     buffer = io.BytesIO()
     qr.save(buffer, 'PNG')
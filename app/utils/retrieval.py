@@ -0,0 +1,151 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+import numpy as np
+from flask import current_app
+
+from ..models import Ticket
+from .text_features import hashed_tokens, ticket_text
+
+
+def embed(text, dim):
+    """
+    Hashed bag-of-words embedding: unigrams and bigrams are hashed into `dim` buckets with a
+    hash-derived sign, counts are log-scaled and the vector is L2-normalised for cosine search.
+    """
+    hashes = hashed_tokens(text)
+    vector = np.zeros(dim, dtype=np.float32)
+    if not hashes.size:
+        return vector
+    signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, (hashes % np.uint64(dim)).astype(np.intp), signs)
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class RetrievalIndex:
+    """
+    Ticket embeddings in a memory-mapped matrix (vectors.npy) with the ticket id of every row
+    in ids.npy (0 for unused rows, -1 for removed ones) and the number of used rows in count.npy.
+    The maps are shared, so in-place updates are visible to every worker; writers serialise on
+    a lock file and a grown or rebuilt index is swapped in with os.replace and reopened by readers.
+    """
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self.vectors = self.ids = self.count = None
+        self.inode = None
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _write_lock(self):
+        with open(self._file('.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._open()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _open(self, create=True):
+        try:
+            inode = os.stat(self._file('vectors.npy')).st_ino
+        except FileNotFoundError:
+            if not create:
+                return False
+            self._write(np.zeros((1024, self.dim), dtype=np.float32), np.zeros(1024, dtype=np.int64), 0)
+            inode = os.stat(self._file('vectors.npy')).st_ino
+        if inode != self.inode:
+            self.vectors = np.load(self._file('vectors.npy'), mmap_mode='r+')
+            self.ids = np.load(self._file('ids.npy'), mmap_mode='r+')
+            self.count = np.load(self._file('count.npy'), mmap_mode='r+')
+            self.inode = inode
+        return True
+
+    def _write(self, vectors, ids, count):
+        for name, array in (('ids.npy', ids), ('count.npy', np.array([count], dtype=np.int64)), ('vectors.npy', vectors)):
+            tmp = self._file(f'.{name}.tmp')
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, self._file(name))
+
+    def upsert(self, ticket_id, text):
+        vector = embed(text, self.dim)
+        with self._write_lock():
+            count = int(self.count[0])
+            rows = np.flatnonzero(self.ids[:count] == ticket_id)
+            if rows.size:
+                row = rows[0]
+            else:
+                if count == len(self.ids):
+                    self._write(np.vstack([self.vectors, np.zeros_like(self.vectors)]),
+                                np.concatenate([self.ids, np.zeros_like(self.ids)]), count)
+                    self._open()
+                row = count
+                self.ids[row] = ticket_id
+                self.count[0] = count + 1
+            self.vectors[row] = vector
+
+    def remove(self, *ticket_ids):
+        with self._write_lock():
+            rows = np.flatnonzero(np.isin(self.ids[:int(self.count[0])], ticket_ids))
+            self.ids[rows] = -1
+            self.vectors[rows] = 0
+
+    def rebuild(self, items):
+        """Replace the index with embeddings of the (ticket_id, text) pairs in `items`."""
+        ids, vectors = [], []
+        for ticket_id, text in items:
+            ids.append(ticket_id)
+            vectors.append(embed(text, self.dim))
+        capacity = max(1024, 1 << len(ids).bit_length())
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        id_column = np.zeros(capacity, dtype=np.int64)
+        if ids:
+            matrix[:len(ids)] = np.stack(vectors)
+            id_column[:len(ids)] = ids
+        with self._write_lock():
+            self._write(matrix, id_column, len(ids))
+            self._open()
+        return len(ids)
+
+    def search(self, text, k=5):
+        """Return up to `k` (ticket_id, cosine similarity) pairs, most similar first."""
+        if not self._open(create=False):
+            return []
+        count = int(self.count[0])
+        query = embed(text, self.dim)
+        if not count or not query.any():
+            return []
+        # A plain ndarray view skips the np.memmap subclass overhead on the matmul
+        scores = np.asarray(self.vectors[:count]) @ query
+        top = np.argpartition(scores, -k)[-k:] if count > k else np.arange(count)
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[row]), float(scores[row])) for row in top if self.ids[row] > 0 and scores[row] > 0]
+
+
+def get_retrieval_index():
+    index = current_app.extensions.get('retrieval_index')
+    if index is None:
+        index = current_app.extensions.setdefault('retrieval_index', RetrievalIndex(
+            current_app.config['RETRIEVAL_INDEX_PATH'], current_app.config['RETRIEVAL_DIM']))
+    return index
+
+
+def index_ticket(ticket):
+    get_retrieval_index().upsert(ticket.id, ticket_text(ticket.title, ticket.description))
+
+
+def unindex_ticket(ticket_id):
+    get_retrieval_index().remove(ticket_id)
+
+
+def search_tickets(text, k=5):
+    matches = get_retrieval_index().search(text, k)
+    tickets = {t.id: t for t in Ticket.query.filter(Ticket.id.in_([ticket_id for ticket_id, _ in matches]))}
+    return [tickets[ticket_id] for ticket_id, _ in matches if ticket_id in tickets]
@@ -0,0 +1,99 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..models import RevokedToken
+
+
+class RevocationList:
+    """
+    In-process mirror of the RevokedToken table, checked on every authenticated request.
+    Lookups are a dict hit; the mirror reads the rows revoked since its last sync at most
+    every `sync_seconds`, and entries are dropped once their token has expired, so memory
+    stays bounded by the number of revoked tokens that are still valid. Rows become visible
+    when their transaction commits, not in id or revoked_at order, so each sync re-reads the
+    last `overlap_seconds` rather than following a strict cursor.
+    """
+    def __init__(self, sync_seconds, overlap_seconds):
+        self.sync_seconds = sync_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.expiries = {}
+        self.heap = []
+        self.synced_through = None
+        self.synced_at = float('-inf')
+        self.lock = threading.Lock()
+    
+    def add(self, jti, expires_at):
+        if jti not in self.expiries and expires_at > time.time():
+            self.expiries[jti] = expires_at
+            heapq.heappush(self.heap, (expires_at, jti))
+    
+    def prune(self, now):
+        while self.heap and self.heap[0][0] <= now:
+            _, jti = heapq.heappop(self.heap)
+            self.expiries.pop(jti, None)
+    
+    def sync(self):
+        # Concurrent requests keep using the current copy while one of them refreshes it
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            started = datetime.now()
+            query = db.session.query(RevokedToken.jti, RevokedToken.expires_at)
+            if self.synced_through is not None:
+                query = query.filter(RevokedToken.revoked_at >= self.synced_through - self.overlap)
+            for jti, expires_at in query:
+                self.add(jti, expires_at.timestamp())
+            self.synced_through = started
+            self.prune(time.time())
+            self.synced_at = time.monotonic()
+        finally:
+            self.lock.release()
+    
+    def is_revoked(self, jti):
+        if time.monotonic() - self.synced_at >= self.sync_seconds:
+            self.sync()
+        return jti in self.expiries
+
+
+def get_revocation_list():
+    revocation_list = current_app.extensions.get('revocation_list')
+    if revocation_list is None:
+        revocation_list = current_app.extensions.setdefault(
+            'revocation_list', RevocationList(current_app.config['JWT_REVOCATION_SYNC_SECONDS'],
+                                              current_app.config['JWT_REVOCATION_SYNC_OVERLAP_SECONDS']))
+    return revocation_list
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    return get_revocation_list().is_revoked(jwt_payload['jti'])
+
+
+def revoke_token(payload):
+    """
+    Revoke a decoded token. The caller commits; this worker stops accepting it right away.
+    Returns False if the token was already revoked, e.g. by a concurrent request presenting
+    the same token, in which case nothing is written.
+    """
+    revocation_list = get_revocation_list()
+    if revocation_list.is_revoked(payload['jti']):
+        return False
+    identity = payload.get('sub')
+    try:
+        with db.session.begin_nested():
+            db.session.add(RevokedToken(
+                jti=payload['jti'],
+                token_type=payload['type'],
+                user_id=identity.get('id') if isinstance(identity, dict) else None,
+                expires_at=datetime.fromtimestamp(payload['exp']),
+            ))
+        revoked = True
+    except IntegrityError:
+        revoked = False
+    revocation_list.add(payload['jti'], payload['exp'])
+    return revoked
@@ -0,0 +1,267 @@
+import base64
+import hashlib
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
+import numpy as np
+from flask import current_app
+
+from .. import db
+from ..models import AuthenticationLog, KnownLoginSource, PushNotification, Ticket, User, PRIORITY_RANKS
+
+BASE32 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567'
+FIRST_NAMES = ('alice', 'bob', 'carla', 'david', 'emma', 'farid', 'grace', 'hugo', 'ines', 'jules', 'karim',
+               'lea', 'malik', 'nina', 'oscar', 'paula', 'quentin', 'rose', 'samir', 'tara', 'ugo', 'vera')
+LAST_NAMES = ('martin', 'bernard', 'dubois', 'thomas', 'robert', 'richard', 'petit', 'durand', 'leroy',
+              'moreau', 'simon', 'laurent', 'lefebvre', 'michel', 'garcia', 'david', 'bertrand', 'roux')
+DOMAINS = ('example.com', 'example.org', 'mail.example.net', 'corp.example.com')
+COMPONENTS = ('Login page', 'Checkout', 'Invoice export', 'Mobile app', 'Search', 'Notifications', 'VPN',
+              'Printer', 'Email sync', 'Dashboard', 'Password reset', 'File upload', 'API', 'Billing')
+SYMPTOMS = ('is slow', 'returns an error', 'crashes on startup', 'shows wrong data', 'times out',
+            'is not loading', 'sends duplicates', 'rejects valid input', 'stopped working', 'looks broken')
+DETAILS = ('It started after the last update.', 'Happens every time since this morning.',
+           'Only some users are affected.', 'Restarting did not help.', 'Screenshot attached.',
+           'It works in another browser.', 'This is blocking our team.', 'Seen on both Wi-Fi and 4G.',
+           'The error code is 500.', 'It was fine yesterday.')
+USER_AGENTS = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36',
+               'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 Version/17.4 Safari/605.1.15',
+               'Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+               'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+               'TicketingApp/2.3 (Android 14)')
+PUSH_SERVICES = ('https://fcm.googleapis.com/fcm/send/', 'https://updates.push.services.mozilla.com/wpush/v2/',
+                 'https://web.push.apple.com/')
+# Relative ticket/login volume by hour of day; weekends get WEEKEND_WEIGHT of it
+HOUR_WEIGHTS = (0.1, 0.05, 0.05, 0.05, 0.1, 0.2, 0.4, 0.7, 1.0, 1.0, 1.0, 0.9, 0.7, 0.9, 1.0, 1.0, 0.9,
+                0.7, 0.5, 0.4, 0.3, 0.25, 0.2, 0.15)
+WEEKEND_WEIGHT = 0.3
+
+
+def _arrivals(seed, start, end, count):
+    """
+    `count` increasing timestamps between start and end, following HOUR_WEIGHTS, the weekend
+    dip and a linear growth towards `end`, so ids and timestamps grow together as in production.
+    """
+    hours = max(int((end - start).total_seconds() // 3600), 1)
+    weights = np.empty(hours)
+    for hour in range(hours):
+        moment = start + timedelta(hours=hour)
+        weights[hour] = HOUR_WEIGHTS[moment.hour] * (WEEKEND_WEIGHT if moment.weekday() >= 5 else 1) \
+            * (0.5 + 0.5 * hour / hours)
+    generator = np.random.default_rng(seed)
+    per_hour = generator.multinomial(count, weights / weights.sum())
+    for hour in np.flatnonzero(per_hour):
+        for offset in np.sort(generator.random(per_hour[hour])):
+            yield start + timedelta(hours=int(hour) + float(offset))
+
+
+def _weighted(rng, population, weights, k):
+    """Pick k items with replacement, for activity skew (a few users file most tickets, log in most)."""
+    return rng.choices(population, cum_weights=weights, k=k) if population else [None] * k
+
+
+class SyntheticData:
+    """
+    Deterministic generator of production-like rows. Everything derives from `seed` and the
+    `until` anchor: the same arguments on the same starting database produce the same rows.
+    User activity is Pareto distributed, older tickets are mostly closed, priorities skew low,
+    logins come in sessions from a few reused (partly shared) addresses per user, and a small
+    share of the log is failed-login bursts from a handful of addresses across many accounts.
+    """
+    def __init__(self, seed, until, days):
+        self.seed = seed
+        self.until = until
+        self.since = until - timedelta(days=days)
+        # Every user's password is 'password'; hashed once, with a salt derived from the seed
+        salt = hashlib.sha256(f'{seed}'.encode()).hexdigest()[:16]
+        iterations = 600000
+        self.password_hash = f'pbkdf2:sha256:{iterations}${salt}$' + \
+            hashlib.pbkdf2_hmac('sha256', b'password', salt.encode(), iterations).hex()
+
+    def _rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def users(self, first_id, count):
+        rng = self._rng('user')
+        for user_id in range(first_id, first_id + count):
+            username = f'{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}{user_id}'
+            yield {
+                'id': user_id,
+                'username': username,
+                'email': f'{username}@{rng.choice(DOMAINS)}',
+                'password_hash': self.password_hash,
+                'role': rng.choices(('consumer', 'engineer', 'admin'), (95, 4.5, 0.5))[0],
+                'otp_secret': ''.join(rng.choices(BASE32, k=16)),
+                'failed_attempts': 0,
+            }
+
+    def activity(self, users, table):
+        """(ids, cumulative Pareto weights) of consumers, engineers and everyone from (id, role, username) rows."""
+        rng = self._rng(f'{table}:activity')
+        pools = {'consumer': ([], []), 'engineer': ([], []), 'all': ([], [])}
+        for user_id, role, _ in users:
+            weight = rng.paretovariate(1.2)
+            for pool in ('engineer' if role in ('engineer', 'admin') else 'consumer', 'all'):
+                ids, weights = pools[pool]
+                ids.append(user_id)
+                weights.append((weights[-1] if weights else 0) + weight)
+        return pools
+
+    def tickets(self, first_id, count, users):
+        rng = self._rng('ticket')
+        engineers = self.activity(users, 'ticket')['engineer']
+        sla_policies = current_app.config['SLA_POLICIES']
+        for ticket_id, created_at in enumerate(_arrivals((self.seed, 1), self.since, self.until, count), first_id):
+            age_days = (self.until - created_at).total_seconds() / 86400
+            closed_share = min(0.97, 0.25 + age_days / 20)
+            status = rng.choices(('closed', 'in_progress', 'open'), (closed_share, (1 - closed_share) * 0.4,
+                                                                     (1 - closed_share) * 0.6))[0]
+            priority = rng.choices(('low', 'medium', 'high'), (50, 35, 15))[0]
+            hours_to_close = rng.expovariate(1 / {'high': 6, 'medium': 30, 'low': 90}[priority])
+            closed_at = min(created_at + timedelta(hours=hours_to_close), self.until) if status == 'closed' else None
+            yield {
+                'id': ticket_id,
+                'title': f'{rng.choice(COMPONENTS)} {rng.choice(SYMPTOMS)}',
+                'description': ' '.join(rng.sample(DETAILS, rng.randint(1, 4))),
+                'status': status,
+                'priority': priority,
+                'priority_rank': PRIORITY_RANKS[priority],
+                'created_at': created_at,
+                'assignee_id': _weighted(rng, *engineers, 1)[0] if status != 'open' else None,
+                'due_at': created_at + sla_policies[priority] if status != 'closed' else None,
+                'comment_count': 0,
+                'last_activity_at': closed_at or min(created_at + timedelta(hours=rng.expovariate(1 / 12)), self.until),
+                'closed_at': closed_at,
+            }
+
+    def authentication_logs(self, count, users):
+        rng = self._rng('authentication_log')
+        ids, cum_weights = self.activity(users, 'authentication_log')['all']
+        usernames = {user_id: username for user_id, _, username in users}
+        # Home addresses come from a pool smaller than the user base, so offices and NATs are shared
+        shared = [f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}' for i in range(max(len(ids) // 3, 1))]
+        attackers = [f'203.0.113.{i}' for i in range(1, 20)]
+        times = _arrivals((self.seed, 2), self.since, self.until, count)
+        emitted = 0
+        while emitted < count:
+            moment = next(times)
+            if rng.random() < 0.002:
+                # Credential stuffing: one address, many accounts (some unknown), a few seconds apart
+                address = rng.choice(attackers)
+                burst = []
+                for user_id in _weighted(rng, ids, cum_weights, rng.randint(10, 100)):
+                    known = rng.random() < 0.7
+                    burst.append((user_id if known else None, 'LOGIN_FAILURE' if known else 'LOGIN_FAILURE_UNKNOWN_USER',
+                                  address, USER_AGENTS[2]))
+            else:
+                user_id = _weighted(rng, ids, cum_weights, 1)[0]
+                homes = [shared[(user_id * 2654435761 + k * 40503) % len(shared)] for k in range(1 + user_id % 3)]
+                address = rng.choice(homes) if rng.random() < 0.95 else f'198.51.100.{rng.randint(1, 254)}'
+                agent = USER_AGENTS[user_id % len(USER_AGENTS)]
+                failures = rng.choices((0, 1, 2, 3), (85, 9, 4, 2))[0]
+                burst = [(user_id, 'LOGIN_FAILURE', address, agent)] * failures
+                burst.append((user_id, 'ACCOUNT_LOCKED' if failures >= 3 else 'LOGIN_SUCCESS', address, agent))
+                if rng.random() < 0.3:
+                    burst.append((user_id, 'LOGOUT', address, agent))
+            burst = burst[:count - emitted]
+            # A session uses one arrival time and skips the ones of its other events, which keeps
+            # the log spread over the whole period with its events a few seconds apart
+            next(islice(times, len(burst) - 1, len(burst) - 1), None)
+            for user_id, event, address, agent in burst:
+                yield {
+                    'user_id': user_id,
+                    'username': f'user{rng.randint(1, 10 ** 6)}' if user_id is None else usernames[user_id],
+                    'event': event,
+                    'ip_address': address,
+                    'user_agent': agent,
+                    'timestamp': moment,
+                }
+                moment += timedelta(seconds=rng.uniform(0.5, 20))
+                emitted += 1
+
+    def push_notifications(self, count, users):
+        rng = self._rng('push_notification')
+        consumers = self.activity(users, 'push_notification')['consumer']
+        if not consumers[0]:
+            return
+        for user_id in _weighted(rng, *consumers, count):
+            token = base64.urlsafe_b64encode(rng.randbytes(48)).decode().rstrip('=')
+            yield {
+                'user_id': user_id,
+                'endpoint': rng.choice(PUSH_SERVICES) + token,
+                'p256dh': base64.urlsafe_b64encode(b'\x04' + rng.randbytes(64)).decode().rstrip('='),
+                'auth': base64.urlsafe_b64encode(rng.randbytes(16)).decode().rstrip('='),
+            }
+
+
+def _insert(model, rows, batch_size):
+    """Core executemany inserts, one transaction per `batch_size` rows. Returns the number of rows."""
+    total = 0
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(model.__table__), batch)
+        total += len(batch)
+    if db.engine.dialect.name == 'postgresql':
+        # Ids were given explicitly, move the sequence past them
+        table = model.__table__.name
+        db.session.execute(db.text(f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                                   f'(SELECT max(id) FROM "{table}"))'))
+        db.session.commit()
+    return total
+
+
+def _remember_login_sources(first_log_id, per_user):
+    """
+    KnownLoginSource rows as the login route would have left them for the logs from
+    `first_log_id` on: the most recent `per_user` addresses each user logged in from.
+    """
+    log = AuthenticationLog
+    last_seen_at = db.func.max(log.timestamp)
+    sources = db.select(
+        log.user_id, log.ip_address, db.func.max(log.user_agent).label('user_agent'), last_seen_at.label('last_seen_at'),
+        db.func.row_number().over(partition_by=log.user_id, order_by=last_seen_at.desc()).label('rank'),
+    ).where(log.id >= first_log_id, log.event == 'LOGIN_SUCCESS', log.user_id.isnot(None), log.ip_address.isnot(None))\
+        .group_by(log.user_id, log.ip_address).subquery()
+    known = KnownLoginSource
+    rows = db.select(sources.c.user_id, sources.c.ip_address, sources.c.user_agent, sources.c.last_seen_at).where(
+        sources.c.rank <= per_user,
+        ~db.exists().where(known.user_id == sources.c.user_id, known.ip_address == sources.c.ip_address),
+    )
+    result = db.session.execute(
+        db.insert(known).from_select(['user_id', 'ip_address', 'user_agent', 'last_seen_at'], rows))
+    db.session.commit()
+    return result.rowcount
+
+
+def seed_database(users, tickets, authentication_logs, push_notifications, seed=0, until=None, days=365,
+                  batch_size=50000, echo=print):
+    """Append synthetic rows to the database (new users and tickets get ids after the existing ones)."""
+    until = until or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    data = SyntheticData(seed, until, days)
+
+    def next_id(model):
+        return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+    steps = (
+        (User, 'users', lambda: data.users(next_id(User), users)),
+        (Ticket, 'tickets', lambda: data.tickets(next_id(Ticket), tickets, population())),
+        (AuthenticationLog, 'authentication logs', lambda: data.authentication_logs(authentication_logs, population())),
+        (PushNotification, 'push subscriptions', lambda: data.push_notifications(push_notifications, population())),
+    )
+
+    def population():
+        return db.session.query(User.id, User.role, User.username).order_by(User.id).all()
+
+    first_log_id = next_id(AuthenticationLog)
+
+    for (model, label, rows), count in zip(steps, (users, tickets, authentication_logs, push_notifications)):
+        if not count:
+            continue
+        started = datetime.now()
+        total = _insert(model, rows(), batch_size)
+        elapsed = (datetime.now() - started).total_seconds()
+        echo(f'{total} {label} in {elapsed:.1f}s ({total / max(elapsed, 1e-6):.0f} rows/s)')
+    if authentication_logs:
+        sources = _remember_login_sources(first_log_id, current_app.config['KNOWN_LOGIN_SOURCES_COUNT'])
+        echo(f'{sources} known login sources')
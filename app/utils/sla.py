@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from flask import current_app, render_template
+
+from .. import db, socketio
+from ..mailer import send_email
+from ..models import Ticket, TicketEvent, User
+
+ESCALATION_LADDER = {'low': 'medium', 'medium': 'high'}
+
+
+def sla_due_at(ticket, start=None):
+    if ticket.status == 'closed':
+        return None
+    target = current_app.config['SLA_POLICIES'].get(ticket.priority or 'medium')
+    return (start or datetime.now()) + target if target else None
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: items are bucketed by the tick they are due in, so advancing
+    the clock only touches the slots that came due. Deadlines past the horizon are
+    rejected and picked up later from the due_at index.
+    """
+    def __init__(self, tick_seconds, slots, now):
+        self.tick_seconds = tick_seconds
+        self.slots = [set() for _ in range(slots)]
+        self.current_tick = self._tick_of(now)
+        self.items = {}
+
+    def _tick_of(self, moment):
+        return int(moment.timestamp() // self.tick_seconds)
+
+    @property
+    def horizon(self):
+        return datetime.fromtimestamp((self.current_tick + len(self.slots)) * self.tick_seconds)
+
+    def schedule(self, item, due_at):
+        self.cancel(item)
+        tick = max(self._tick_of(due_at), self.current_tick)
+        if tick >= self.current_tick + len(self.slots):
+            return False
+        self.slots[tick % len(self.slots)].add(item)
+        self.items[item] = tick
+        return True
+
+    def cancel(self, item):
+        tick = self.items.pop(item, None)
+        if tick is not None:
+            self.slots[tick % len(self.slots)].discard(item)
+
+    def advance(self, now):
+        """Move the clock to `now` and return the items that came due."""
+        due = []
+        target = self._tick_of(now)
+        while self.current_tick <= target:
+            slot = self.slots[self.current_tick % len(self.slots)]
+            ready = [item for item in slot if self.items[item] <= target]
+            for item in ready:
+                slot.discard(item)
+                del self.items[item]
+            due.extend(ready)
+            if self.current_tick == target:
+                break
+            self.current_tick += 1
+        return due
+
+
+class EscalationEngine:
+    """
+    Keeps upcoming SLA deadlines in a TimerWheel. Each tick loads the deadlines that entered
+    the wheel horizon (range scan on the due_at index), reschedules tickets seen in the change
+    feed since the last tick and escalates what came due, so the work is O(due + changed).
+    """
+    def __init__(self, app):
+        self.app = app
+        now = datetime.now()
+        self.wheel = TimerWheel(app.config['SLA_TICK_SECONDS'], app.config['SLA_WHEEL_SLOTS'], now)
+        self.loaded_until = None
+        self.event_cursor = None
+
+    def tick(self, now=None):
+        now = now or datetime.now()
+        with self.app.app_context():
+            if self.event_cursor is None:
+                self.event_cursor = db.session.query(db.func.max(TicketEvent.id)).scalar() or 0
+            self._load_horizon()
+            self._apply_changes()
+            due = self.wheel.advance(now)
+            escalated = []
+            for ticket in Ticket.query.filter(Ticket.id.in_(due)).all() if due else []:
+                if ticket.due_at and ticket.due_at <= now:
+                    escalated.append(ticket)
+                elif ticket.due_at and ticket.due_at < self.loaded_until:
+                    # Due later in the tick that just started: back on the wheel for the next tick
+                    self.wheel.schedule(ticket.id, ticket.due_at)
+            for ticket in escalated:
+                self.escalate(ticket, now)
+            db.session.commit()
+            for ticket in escalated:
+                self.notify(ticket)
+            return escalated
+
+    def _load_horizon(self):
+        horizon = self.wheel.horizon
+        query = db.session.query(Ticket.id, Ticket.due_at).filter(Ticket.due_at < horizon)
+        if self.loaded_until is not None:
+            query = query.filter(Ticket.due_at >= self.loaded_until)
+        for ticket_id, due_at in query:
+            self.wheel.schedule(ticket_id, due_at)
+        self.loaded_until = horizon
+
+    def _apply_changes(self):
+        changes = db.session.query(TicketEvent.id, TicketEvent.ticket_id, TicketEvent.action)\
+            .filter(TicketEvent.id > self.event_cursor).order_by(TicketEvent.id).all()
+        if not changes:
+            return
+        self.event_cursor = changes[-1].id
+        changed = {change.ticket_id for change in changes}
+        for ticket_id in changed:
+            self.wheel.cancel(ticket_id)
+        for ticket_id, due_at in db.session.query(Ticket.id, Ticket.due_at).filter(Ticket.id.in_(changed)):
+            if due_at and due_at < self.loaded_until:
+                self.wheel.schedule(ticket_id, due_at)
+
+    def escalate(self, ticket, now):
+        ticket.escalated_at = now
+        next_priority = ESCALATION_LADDER.get(ticket.priority)
+        if next_priority:
+            ticket.priority, ticket.priority_source = next_priority, 'sla'
+            ticket.due_at = sla_due_at(ticket, now)
+            if ticket.due_at and ticket.due_at < self.loaded_until:
+                self.wheel.schedule(ticket.id, ticket.due_at)
+        else:
+            ticket.due_at = None
+        TicketEvent.record(ticket, 'updated')
+
+    def notify(self, ticket):
+        recipients = User.query.filter(db.or_(User.role == 'admin', User.id == ticket.assignee_id)).all()
+        subject = f'SLA Breach: {ticket.title}'
+        for user in recipients:
+            body = render_template('sla_breach_notification.html', ticket=ticket, username=user.username)
+            send_email(subject, user.email, body)
+        socketio.emit('ticket_escalated', ticket.serialize())
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import threading
+import time
+
+import socketio
+
+
+class SQLiteManager(socketio.PubSubManager):
+    """
+    Socket.IO client manager that fans events out between worker processes through a
+    SQLite table, for single-host deployments and tests without a Redis/Kafka broker.
+    Publishers append rows; every worker polls for rows newer than the last one it saw.
+    """
+    name = 'sqlite'
+
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None,
+                 poll_interval=0.02, retention=60):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = url[len('sqlite:///'):]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.local = threading.local()
+        self.published = 0
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS socketio_message ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+                'payload TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def _sleep(self, seconds):
+        if self.server is not None:
+            self.server.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _publish(self, data):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('INSERT INTO socketio_message (channel, payload, created_at) VALUES (?, ?, ?)',
+                           (self.channel, json.dumps(data), now))
+        self.published += 1
+        if self.published % 1000 == 0:
+            connection.execute('DELETE FROM socketio_message WHERE created_at < ?', (now - self.retention,))
+
+    def _listen(self):
+        connection = self._connection()
+        last_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_message').fetchone()[0]
+        while True:
+            rows = connection.execute('SELECT id, payload FROM socketio_message WHERE id > ? AND channel = ? ORDER BY id',
+                                      (last_id, self.channel)).fetchall()
+            for last_id, payload in rows:
+                yield json.loads(payload)
+            if not rows:
+                self._sleep(self.poll_interval)
+
+
+def create_client_manager(url, channel='flask-socketio', write_only=False, poll_interval=0.02):
+    """Pick the Socket.IO client manager for a message queue URL, as Flask-SocketIO does, plus sqlite:///."""
+    if url.startswith('sqlite:///'):
+        return SQLiteManager(url, channel=channel, write_only=write_only, poll_interval=poll_interval)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=write_only)
+    if url.startswith('kafka://'):
+        return socketio.KafkaManager(url, channel=channel, write_only=write_only)
+    if url.startswith('zmq'):
+        return socketio.ZmqManager(url, channel=channel, write_only=write_only)
+    return socketio.KombuManager(url, channel=channel, write_only=write_only)
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from flask import current_app
+
+
+def subsystem_enabled(name, app=None):
+    config = (app or current_app).config
+    if config.get('LEAN_STARTUP'):
+        return False
+    return name in config.get('OPTIONAL_SUBSYSTEMS', ())
+
+
+def import_time_report(module='app'):
+    """
+    Import `module` in a fresh interpreter with -X importtime and return
+    (total_us, {top_level_package: self_us}) so cold-start costs can be compared.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else f'Cannot import {module}')
+    
+    total_us = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    return total_us, packages
@@ -0,0 +1,24 @@
+import re
+import zlib
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+
+def ticket_text(title, description):
+    return f'{title or ""} {description or ""}'
+
+
+def hashed_tokens(text, bigrams=True):
+    """
+    Stable 32-bit hashes of the word unigrams (and bigrams) of `text`. crc32 is used
+    instead of hash() so values are identical across processes and restarts.
+    """
+    tokens = tokenize(text)
+    features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])] if bigrams else tokens
+    return np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint64, count=len(features))
@@ -0,0 +1,150 @@
+import os
+import random
+
+import numpy as np
+from flask import current_app
+
+from .. import db
+from ..models import Ticket
+from .text_features import hashed_tokens, ticket_text
+
+TARGETS = ('priority', 'status')
+# Priorities the model predicted or SLA escalation raised are not training labels
+MACHINE_PRIORITY_SOURCES = ('triage', 'sla')
+
+
+def features(text, dim):
+    return (hashed_tokens(text) % np.uint64(dim)).astype(np.intp)
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes over hashed unigram/bigram counts."""
+    def __init__(self, classes, log_prior, log_likelihood):
+        self.classes = classes
+        self.log_prior = log_prior
+        self.log_likelihood = log_likelihood
+
+    @classmethod
+    def fit(cls, documents, labels, dim, alpha=1.0):
+        classes, label_ids = np.unique(np.asarray(labels), return_inverse=True)
+        cells = np.concatenate([label_id * dim + document for label_id, document in zip(label_ids, documents)])
+        counts = np.bincount(cells, minlength=len(classes) * dim).reshape(len(classes), dim) + alpha
+        log_likelihood = np.log(counts / counts.sum(axis=1, keepdims=True)).astype(np.float32)
+        log_prior = np.log(np.bincount(label_ids, minlength=len(classes)) / len(label_ids)).astype(np.float32)
+        return cls(classes, log_prior, log_likelihood)
+
+    def predict(self, document):
+        scores = self.log_prior + self.log_likelihood[:, document].sum(axis=1)
+        return str(self.classes[int(np.argmax(scores))])
+
+
+class TriageModel:
+    def __init__(self, dim, heads):
+        self.dim = dim
+        self.heads = heads
+
+    @classmethod
+    def fit(cls, tickets, dim):
+        """
+        Train one classifier per target from (title, description, priority, status) rows; each
+        head only learns from the rows whose label for it is not None.
+        """
+        documents = [features(ticket_text(title, description), dim) for title, description, _, _ in tickets]
+        heads = {}
+        for i, target in enumerate(TARGETS):
+            labelled = [(document, ticket[2 + i]) for document, ticket in zip(documents, tickets)
+                        if ticket[2 + i] is not None]
+            if not labelled:
+                raise ValueError(f'No {target} labels to train on')
+            heads[target] = NaiveBayes.fit([document for document, _ in labelled],
+                                           [label for _, label in labelled], dim)
+        return cls(dim, heads)
+
+    def predict(self, title, description):
+        document = features(ticket_text(title, description), self.dim)
+        return {target: head.predict(document) for target, head in self.heads.items()}
+
+    def accuracy(self, tickets):
+        hits, counts = dict.fromkeys(TARGETS, 0), dict.fromkeys(TARGETS, 0)
+        for title, description, *labels in tickets:
+            prediction = self.predict(title, description)
+            for target, label in zip(TARGETS, labels):
+                if label is not None:
+                    hits[target] += prediction[target] == label
+                    counts[target] += 1
+        return {target: hits[target] / counts[target] for target in TARGETS if counts[target]}
+
+    def save(self, path):
+        arrays = {'dim': np.array(self.dim)}
+        for target, head in self.heads.items():
+            arrays[f'{target}_classes'] = head.classes
+            arrays[f'{target}_log_prior'] = head.log_prior
+            arrays[f'{target}_log_likelihood'] = head.log_likelihood
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            heads = {
+                target: NaiveBayes(arrays[f'{target}_classes'], arrays[f'{target}_log_prior'],
+                                   arrays[f'{target}_log_likelihood'])
+                for target in TARGETS
+            }
+            return cls(int(arrays['dim']), heads)
+
+
+def training_tickets():
+    """
+    (title, description, priority, status) rows with only human labels: a priority set by the
+    model or by SLA escalation is None, and so is a closed status, which says where the ticket
+    ended up rather than how it should have been triaged.
+    """
+    priority = db.case((Ticket.priority_source.in_(MACHINE_PRIORITY_SOURCES), None), else_=Ticket.priority)
+    status = db.case((Ticket.status == 'closed', None), else_=Ticket.status)
+    return [tuple(row) for row in db.session.query(Ticket.title, Ticket.description, priority, status)
+            .filter(db.or_(priority.isnot(None), status.isnot(None)))]
+
+
+def train_triage_model(holdout=0.2, seed=0):
+    """
+    Train on training_tickets() and save the model to TRIAGE_MODEL_PATH. Returns the number
+    of tickets and {target: (accuracy, majority baseline)} on a `holdout` share held out.
+    """
+    tickets = training_tickets()
+    if not tickets:
+        raise ValueError('No tickets to train on')
+    dim = current_app.config['TRIAGE_FEATURES']
+
+    random.Random(seed).shuffle(tickets)
+    held_out = tickets[:int(len(tickets) * holdout)]
+    report = {}
+    if held_out:
+        model = TriageModel.fit(tickets[len(held_out):], dim)
+        for target, accuracy in model.accuracy(held_out).items():
+            labels = [ticket[2 + TARGETS.index(target)] for ticket in held_out]
+            labels = [label for label in labels if label is not None]
+            report[target] = (accuracy, max(labels.count(label) for label in set(labels)) / len(labels))
+
+    TriageModel.fit(tickets, dim).save(current_app.config['TRIAGE_MODEL_PATH'])
+    return len(tickets), report
+
+
+def get_triage_model():
+    """The trained model, reloaded when the model file changes, or None if none was trained yet."""
+    path = current_app.config['TRIAGE_MODEL_PATH']
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    cached = current_app.extensions.get('triage_model')
+    if cached is None or cached[0] != mtime:
+        cached = current_app.extensions['triage_model'] = (mtime, TriageModel.load(path))
+    return cached[1]
+
+
+def predict_triage(title, description):
+    model = get_triage_model()
+    return model.predict(title, description) if model else None
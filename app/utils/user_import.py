@@ -0,0 +1,184 @@
+import codecs
+import csv
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from flask import current_app, render_template
+from flask_mail import Message
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from .. import db, mail, socketio
+from ..models import User
+
+ROLES = ('consumer', 'engineer', 'admin')
+FIELDS = ('username', 'email', 'password', 'role')
+
+logger = logging.getLogger(__name__)
+
+
+class UserImportError(Exception):
+    pass
+
+
+def read_rows(stream, format):
+    """Yield (row number, dict) from a CSV (with a header line) or NDJSON byte stream, without reading it all."""
+    lines = codecs.getreader('utf-8-sig')(stream, errors='replace')
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or not set(FIELDS) <= {name.strip() for name in reader.fieldnames}:
+            raise UserImportError(f'CSV header must contain {", ".join(FIELDS)}')
+        for number, row in enumerate(reader, 1):
+            yield number, {key.strip(): value for key, value in row.items() if key}
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else {'_invalid': True}
+
+
+def validate(row):
+    if row.get('_invalid'):
+        return 'Invalid JSON object'
+    values = {field: str(row.get(field) or '').strip() for field in FIELDS}
+    missing = [field for field in FIELDS if not values[field]]
+    if missing:
+        return f'Missing {", ".join(missing)}'
+    if values['role'] not in ROLES:
+        return 'Invalid role'
+    if len(values['username']) > 64 or len(values['email']) > 120 or '@' not in values['email']:
+        return 'Invalid username or email'
+    row.update(values)
+    return None
+
+
+class UserImport:
+    """
+    Bulk user creation from a stream of rows, batch by batch: rows are validated, checked for
+    uniqueness against the rest of the import and, with one IN query per column, against the
+    username/email indexes; passwords are hashed on a process pool; the batch is inserted
+    with one executemany. A batch that still hits a unique constraint (a concurrent signup)
+    is retried row by row to find the culprit. Errors are reported per row number, in row order.
+    """
+    def __init__(self, pool, workers, batch_size, max_errors):
+        self.pool = pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.usernames = set()
+        self.emails = set()
+        self.created = []
+        self.errors = []
+        self.batch_errors = []
+        self.failed = 0
+
+    def error(self, number, row, message):
+        self.failed += 1
+        self.batch_errors.append({'row': number, 'username': (row or {}).get('username'), 'error': message})
+
+    def run(self, rows):
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            self.import_batch(batch)
+            # Conflicts found against the database come after the batch's validation errors;
+            # batches are in row order, so sorting each one keeps the whole list (and the cap) in order
+            self.batch_errors.sort(key=lambda error: error['row'])
+            self.errors.extend(self.batch_errors[:self.max_errors - len(self.errors)])
+            self.batch_errors.clear()
+        return {
+            'created': len(self.created),
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def import_batch(self, batch):
+        valid = []
+        for number, row in batch:
+            message = validate(row)
+            if message is None and (row['username'] in self.usernames or row['email'] in self.emails):
+                message = 'Duplicate username or email in the import'
+            if message:
+                self.error(number, row, message)
+                continue
+            self.usernames.add(row['username'])
+            self.emails.add(row['email'])
+            valid.append((number, row))
+        if not valid:
+            return
+
+        taken_usernames = {username for username, in db.session.query(User.username)
+                           .filter(User.username.in_([row['username'] for _, row in valid]))}
+        taken_emails = {email for email, in db.session.query(User.email)
+                        .filter(User.email.in_([row['email'] for _, row in valid]))}
+        new = []
+        for number, row in valid:
+            if row['username'] in taken_usernames or row['email'] in taken_emails:
+                self.error(number, row, 'Username or email already taken')
+            else:
+                new.append((number, row))
+        if not new:
+            return
+
+        hashes = self.pool.map(generate_password_hash, [row['password'] for _, row in new],
+                               chunksize=max(1, len(new) // (4 * self.workers)))
+        values = [{'username': row['username'], 'email': row['email'], 'role': row['role'], 'password_hash': password_hash}
+                  for (_, row), password_hash in zip(new, hashes)]
+        try:
+            db.session.execute(db.insert(User), values)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            inserted = []
+            for (number, row), value in zip(new, values):
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(db.insert(User), value)
+                    inserted.append(value)
+                except IntegrityError:
+                    self.error(number, row, 'Username or email already taken')
+            db.session.commit()
+            values = inserted
+        self.created.extend((value['username'], value['email'], value['role']) for value in values)
+
+
+def import_users(stream, format):
+    """Create the users of a CSV/NDJSON stream and queue their welcome emails. Returns the import report."""
+    config = current_app.config
+    workers = max(1, min(config['USER_IMPORT_HASH_WORKERS'] or os.cpu_count() or 1, os.cpu_count() or 1))
+    # A pool per import: hashing needs it for seconds at a time, and spawned processes do not
+    # inherit the worker's threads (log writer, eventlet hub) the way forked ones would
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        user_import = UserImport(pool, workers, config['USER_IMPORT_BATCH_SIZE'], config['USER_IMPORT_MAX_ERRORS'])
+        report = user_import.run(read_rows(stream, format))
+    if user_import.created:
+        socketio.start_background_task(send_welcome_emails, current_app._get_current_object(), user_import.created)
+    return report
+
+
+def send_welcome_emails(app, users):
+    """Send the registration emails of an import over one SMTP connection, outside the request."""
+    sent = 0
+    with app.app_context():
+        try:
+            with mail.connect() as connection:
+                for username, email, role in users:
+                    message = Message('Registration Confirmation', recipients=[email])
+                    message.body = render_template('email_confirmation.html', username=username, role=role)
+                    try:
+                        connection.send(message)
+                        sent += 1
+                    except Exception as e:
+                        logger.warning('Failed to send the welcome email to %s: %s', email, e,
+                                       extra={'username': username})
+        except Exception:
+            logger.exception('Could not connect to the mail server for the welcome emails')
+        logger.info('Sent %d of %d welcome emails', sent, len(users))
@@ -0,0 +1,85 @@
+"""
+Contention benchmark for POST /api/tickets/claim.
+
+Runs N claimer processes against one SQLite database until the queue is empty and
+checks that no ticket was handed out twice.
+
+    python -m benchmarks.bench_claims --claimers 32 --tickets 5000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from config import Config
+from app import create_app, db
+from app.models import Ticket, User
+
+
+def make_app(database_uri):
+    config = type('BenchConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': database_uri, 'LEAN_STARTUP': True})
+    return create_app(config)
+
+
+def claimer(database_uri, engineer_id, start, results):
+    app = make_app(database_uri)
+    claimed, latencies = [], []
+    with app.app_context():
+        start.wait()
+        while True:
+            began = time.perf_counter()
+            ticket = Ticket.claim_next(engineer_id)
+            db.session.commit()
+            latencies.append(time.perf_counter() - began)
+            if not ticket:
+                break
+            claimed.append(ticket.id)
+    results.put((claimed, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--claimers', type=int, default=32)
+    parser.add_argument('--tickets', type=int, default=5000)
+    args = parser.parse_args()
+    
+    database_uri = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_claims.db")}'
+    app = make_app(database_uri)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(username=f'engineer{i}', email=f'engineer{i}@localhost', role='engineer')
+                            for i in range(args.claimers)])
+        rng = random.Random(0)
+        db.session.add_all([Ticket(title=f'Ticket {i}', description='benchmark',
+                                   priority=rng.choice(['low', 'medium', 'medium', 'high']))
+                            for i in range(args.tickets)])
+        db.session.commit()
+    
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=claimer, args=(database_uri, i + 1, start, results))
+               for i in range(args.claimers)]
+    for worker in workers:
+        worker.start()
+    time.sleep(1)
+    began = time.perf_counter()
+    start.set()
+    outcomes = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - began
+    for worker in workers:
+        worker.join()
+    
+    claimed = [ticket_id for ids, _ in outcomes for ticket_id in ids]
+    latencies = sorted(latency for _, lat in outcomes for latency in lat)
+    print(f'claimers: {args.claimers}, tickets: {args.tickets}')
+    print(f'claimed: {len(claimed)}, duplicates: {len(claimed) - len(set(claimed))}')
+    print(f'throughput: {len(claimed) / elapsed:.0f} claims/s')
+    print(f'latency p50: {statistics.median(latencies) * 1000:.2f} ms, '
+          f'p99: {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max: {latencies[-1] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Thundering-herd benchmark for request coalescing on GET /api/tickets.
+
+Serves the app from a threaded server, releases `--clients` concurrent identical
+requests at once for `--rounds` rounds, and compares the number of SQL statements
+and the latency with REQUEST_COALESCING_ENABLED off and on.
+
+    python -m benchmarks.bench_coalescing --clients 64 --tickets 2000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.request
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from config import Config
+from app import create_app, db
+from app.models import Ticket, User
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def make_app(database_uri):
+    config = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'LEAN_STARTUP': True,
+        'RATELIMIT_ENABLED': False,
+        'LOAD_SHEDDING_ENABLED': False,
+    })
+    return create_app(config)
+
+
+def herd(url, tokens, rounds):
+    latencies = []
+    barrier = threading.Barrier(len(tokens))
+
+    def client(token):
+        for _ in range(rounds):
+            barrier.wait()
+            began = time.perf_counter()
+            request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+            with urllib.request.urlopen(request) as response:
+                response.read()
+            latencies.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client, args=(token,)) for token in tokens]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--tickets', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app(f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_coalescing.db")}')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(username=f'user{i}', email=f'user{i}@localhost', role='consumer')
+                            for i in range(args.clients)])
+        db.session.add_all([Ticket(title=f'Ticket {i}', description='benchmark ' * 20, priority='medium')
+                            for i in range(args.tickets)])
+        db.session.commit()
+        tokens = [create_access_token(identity={'id': i + 1, 'role': 'consumer'}) for i in range(args.clients)]
+        statements = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/api/tickets'
+
+    print(f'clients: {args.clients}, rounds: {args.rounds}, tickets: {args.tickets}')
+    for enabled in (False, True):
+        app.config['REQUEST_COALESCING_ENABLED'] = enabled
+        statements[0] = 0
+        began = time.perf_counter()
+        latencies = herd(url, tokens, args.rounds)
+        elapsed = time.perf_counter() - began
+        requests = len(latencies)
+        print(f'coalescing {"on " if enabled else "off"}: {statements[0]:5d} SQL statements '
+              f'({statements[0] / requests:.2f}/request), {requests / elapsed:6.0f} requests/s, '
+              f'p50: {statistics.median(latencies) * 1000:7.2f} ms, '
+              f'p99: {latencies[int(requests * 0.99)] * 1000:7.2f} ms')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Per-call cost of logging on the request path.
+
+Times every logger.info() call made inside a request context, with the output going to a
+file, and reports the distribution (p50/p99/p99.9/max) for:
+
+- direct: a synchronous FileHandler with the JSON formatter (what logging in the request
+  would cost without the pipeline),
+- pipeline: the QueueHandler of app/utils/log_pipeline.py, the writer thread doing the I/O,
+- sampled out: an 'app.access' record dropped by sampling,
+- queue full: a record dropped because the writer cannot keep up.
+
+`--sink-delay-ms` makes every write that slow, e.g. to see a stalled disk or pipe.
+
+    python -m benchmarks.bench_logging --records 100000 --sink-delay-ms 1
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import statistics
+import tempfile
+import time
+
+from flask import Flask, g
+
+from app.utils.log_pipeline import DroppingQueueHandler, JSONFormatter, RequestContextFilter
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, path, delay):
+        super().__init__(path)
+        self.delay = delay
+
+    def emit(self, record):
+        if self.delay:
+            time.sleep(self.delay)
+        super().emit(record)
+
+
+def measure(logger, records):
+    timings = []
+    for i in range(records):
+        began = time.perf_counter_ns()
+        logger.info('ticket %d updated by %s', i, 'engineer', extra={'ticket_id': i})
+        timings.append(time.perf_counter_ns() - began)
+    return sorted(timings)
+
+
+def report(label, timings):
+    count = len(timings)
+    print(f'{label:<12} p50 {statistics.median(timings) / 1000:8.2f} us   '
+          f'p99 {timings[int(count * 0.99)] / 1000:8.2f} us   '
+          f'p99.9 {timings[int(count * 0.999)] / 1000:9.2f} us   '
+          f'max {timings[-1] / 1000:10.2f} us')
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--sink-delay-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    delay = args.sink_delay_ms / 1000
+    directory = tempfile.mkdtemp()
+    # Without a slow sink all the records fit in the writer's backlog; with one, cap the run
+    # so the synchronous case finishes in reasonable time
+    records = args.records if not delay else min(args.records, int(5 / delay))
+
+    app = Flask(__name__)
+    print(f'records: {records}, sink delay: {args.sink_delay_ms} ms, queue size: {args.queue_size}')
+    with app.test_request_context():
+        g.request_id = 'bench'
+        filter_ = RequestContextFilter({'bench.sampled': 0.0})
+
+        direct = SlowFileHandler(os.path.join(directory, 'direct.log'), delay)
+        direct.setFormatter(JSONFormatter())
+        direct.addFilter(filter_)
+        report('direct', measure(make_logger('bench.direct', direct), records))
+
+        records_queue = queue.Queue(args.queue_size)
+        handler = DroppingQueueHandler(records_queue)
+        handler.full = queue.Full
+        handler.addFilter(filter_)
+        output = SlowFileHandler(os.path.join(directory, 'pipeline.log'), delay)
+        output.setFormatter(JSONFormatter())
+        listener = logging.handlers.QueueListener(records_queue, output)
+        listener.start()
+        report('pipeline', measure(make_logger('bench.pipeline', handler), records))
+        report('sampled out', measure(make_logger('bench.sampled', handler), records))
+        listener.stop()
+
+        # Nobody drains the queue: once it is full every call takes the drop path
+        handler.dropped = 0
+        logger = make_logger('bench.full', handler)
+        measure(logger, args.queue_size)
+        report('queue full', measure(logger, records))
+        print(f'dropped: {handler.dropped}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Emit-to-delivery latency of the Socket.IO message queue as the worker count grows.
+
+For each worker count, serves the app from that many eventlet worker processes sharing
+the configured queue, connects `--clients` Socket.IO clients to each worker, calls
+socketio.emit('ticket_updated', ...) `--events` times at `--rate` per second from a
+separate app process, as the request handlers and the scheduler do, and reports how long
+each emit took to reach every client.
+
+    python -m benchmarks.bench_socketio_fanout --workers 1,2,4,8,16
+    python -m benchmarks.bench_socketio_fanout --queue redis://localhost:6379/0
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from config import Config
+
+
+def make_app(queue_url, database_uri):
+    from app import create_app
+    config = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SOCKETIO_MESSAGE_QUEUE': queue_url,
+        'LEAN_STARTUP': True,
+        'RATELIMIT_ENABLED': False,
+        'LOAD_SHEDDING_ENABLED': False,
+        'LOG_ACCESS': False,
+    })
+    return create_app(config)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def worker(queue_url, database_uri, port):
+    import eventlet
+    eventlet.monkey_patch()
+    from app import socketio
+    socketio.run(make_app(queue_url, database_uri), host='127.0.0.1', port=port, log_output=False)
+
+
+def audience(ports, clients, events, ready, results):
+    import socketio as socketio_client
+    latencies = []
+    done = threading.Semaphore(0)
+    lock = threading.Lock()
+
+    def connect(port):
+        client = socketio_client.Client()
+
+        @client.on('ticket_updated')
+        def on_ticket_updated(data):
+            latency = time.time() - data['sent_at']
+            with lock:
+                latencies.append(latency)
+            if data['seq'] == events - 1:
+                done.release()
+
+        # The worker may still be starting
+        for _ in range(100):
+            try:
+                client.connect(f'http://127.0.0.1:{port}', transports=['polling'], wait_timeout=5)
+                return client
+            except socketio_client.exceptions.ConnectionError:
+                time.sleep(0.1)
+        raise RuntimeError(f'worker on port {port} did not accept connections')
+
+    connected = [connect(port) for port in ports for _ in range(clients)]
+    ready.set()
+    for _ in connected:
+        done.acquire(timeout=60)
+    for client in connected:
+        client.disconnect()
+    results.put(latencies)
+
+
+def publisher(queue_url, database_uri, events, rate):
+    from app import socketio
+    app = make_app(queue_url, database_uri)
+    with app.app_context():
+        for seq in range(events):
+            socketio.emit('ticket_updated', {'id': seq, 'status': 'open', 'seq': seq, 'sent_at': time.time()})
+            time.sleep(1 / rate)
+
+
+def run(queue_url, database_uri, workers, clients, events, rate):
+    ports = [free_port() for _ in range(workers)]
+    servers = [multiprocessing.Process(target=worker, args=(queue_url, database_uri, port), daemon=True)
+               for port in ports]
+    for process in servers:
+        process.start()
+    ready, results = multiprocessing.Event(), multiprocessing.Queue()
+    clients_process = multiprocessing.Process(target=audience, args=(ports, clients, events, ready, results))
+    clients_process.start()
+    ready.wait()
+    # Each worker starts listening to the queue when its first client connects
+    time.sleep(0.5)
+    multiprocessing.Process(target=publisher, args=(queue_url, database_uri, events, rate)).start()
+    latencies = sorted(results.get())
+    clients_process.join()
+    for process in servers:
+        process.terminate()
+        process.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queue', help='message queue URL, defaults to a temporary SQLite broker')
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--clients', type=int, default=4, help='Socket.IO clients per worker')
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=200, help='emits per second')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    queue_url = args.queue or f'sqlite:///{os.path.join(directory, "socketio.db")}'
+    database_uri = f'sqlite:///{os.path.join(directory, "bench_socketio_fanout.db")}'
+    print(f'queue: {queue_url}, clients per worker: {args.clients}, events: {args.events}, rate: {args.rate:.0f}/s')
+    for workers in map(int, args.workers.split(',')):
+        latencies = run(queue_url, database_uri, workers, args.clients, args.events, args.rate)
+        expected = workers * args.clients * args.events
+        print(f'workers: {workers:3d}  deliveries: {len(latencies):6d}/{expected}  '
+              f'p50: {statistics.median(latencies) * 1000:7.2f} ms  '
+              f'p99: {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms  '
+              f'max: {latencies[-1] * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'secret-key'
@@ -9,6 +11,12 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=30)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Identities are {'id', 'role'} dicts rather than strings
+    JWT_VERIFY_SUB = False
+    # How stale a worker's in-memory copy of the revoked tokens may get, and how far back each
+    # sync re-reads (longer than any transaction that revokes a token)
+    JWT_REVOCATION_SYNC_SECONDS = 1
+    JWT_REVOCATION_SYNC_OVERLAP_SECONDS = 60
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
     MAIL_USE_TLS = True
@@ -17,7 +25,110 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SEND = os.environ.get('MAIL_USERNAME') or 'admin@localhost.com'
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    MAX_FAILED_LOGIN_ATTEMPTS = 3
+    ACCOUNT_LOCK_MINUTES = 15
+    # Login sources (IP) remembered per user for suspicious-login detection
+    KNOWN_LOGIN_SOURCES_COUNT = 5
+    KNOWN_LOGIN_SOURCES_MAX_AGE_DAYS = 90
+    # Tombstones are kept this long; change-feed cursors from before a dropped one must resync
+    TICKET_CHANGES_RETENTION_DAYS = 7
+    TICKET_CLAIM_LEASE_MINUTES = 30
+    # Applied to every new SQLite connection; WAL lets readers run alongside the single writer
+    SQLITE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 10000}
+    # Response target per priority; a breach escalates the ticket to the next priority
+    SLA_POLICIES = {'high': timedelta(hours=4), 'medium': timedelta(hours=24), 'low': timedelta(hours=72)}
+    SLA_TICK_SECONDS = 30
+    SLA_WHEEL_SLOTS = 240
+    # Near-duplicate detection on ticket creation (MinHash with LSH_BANDS x LSH_ROWS permutations)
+    DUPLICATE_LSH_BANDS = 8
+    DUPLICATE_LSH_ROWS = 4
+    DUPLICATE_SIMILARITY_THRESHOLD = 0.5
+    # Link new tickets to an open ticket at least this similar, None to only report candidates
+    DUPLICATE_AUTOLINK_THRESHOLD = None
+    # Ticket attachments, stored once per distinct content under their sha256 (no size limit if None)
+    ATTACHMENTS_PATH = os.environ.get('ATTACHMENTS_PATH') or os.path.join(basedir, 'instance', 'attachments')
+    ATTACHMENT_MAX_BYTES = 50 * 1024 * 1024
+    ATTACHMENT_CHUNK_SIZE = 64 * 1024
+    # Local ticket retrieval for the chatbot (memory-mapped hashed embeddings)
+    RETRIEVAL_INDEX_PATH = os.environ.get('RETRIEVAL_INDEX_PATH') or os.path.join(basedir, 'instance', 'retrieval')
+    RETRIEVAL_DIM = 256
+    CHATBOT_CONTEXT_TICKETS = 5
+    # Local priority/status classifier, trained with flask train-triage-model
+    TRIAGE_MODEL_PATH = os.environ.get('TRIAGE_MODEL_PATH') or os.path.join(basedir, 'instance', 'triage_model.npz')
+    TRIAGE_FEATURES = 1 << 16
+    # Also ask the LLM for a title and description in ai_generate_ticket
+    TRIAGE_LLM_ENRICHMENT = os.environ.get('TRIAGE_LLM_ENRICHMENT', 'false').lower() in ('1', 'true', 'yes')
+    # Broker for Socket.IO fan-out between worker processes: redis://, kafka://, amqp:// or
+    # sqlite:///path for a single-host broker. Unset keeps events in the emitting process.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_QUEUE_POLL_INTERVAL = 0.02
+    # serve.py: listen address, preforked workers, concurrent connections per worker and
+    # how long a retired worker may take to finish in-flight requests
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS') or os.cpu_count() or 1)
+    WEB_WORKER_CONNECTIONS = int(os.environ.get('WEB_WORKER_CONNECTIONS', 1000))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+    # Admission control: shed low, then normal priority requests with 503 + Retry-After when the
+    # queueing latency target or the in-flight limit of a worker is exceeded. Classes are keyed by
+    # 'endpoint:METHOD', 'endpoint' or 'blueprint'; other writes are critical and reads normal.
+    LOAD_SHEDDING_ENABLED = os.environ.get('LOAD_SHEDDING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    LOAD_SHEDDING_TARGET_MS = 250
+    LOAD_SHEDDING_MAX_IN_FLIGHT = 256
+    LOAD_SHEDDING_WINDOW_SECONDS = 5
+    # Only behind a proxy that sets X-Request-Start and strips the client's copy
+    LOAD_SHEDDING_TRUST_REQUEST_START = os.environ.get('LOAD_SHEDDING_TRUST_REQUEST_START', '').lower() in ('1', 'true', 'yes')
+    LOAD_SHEDDING_CLASSES = {
+        'auth': 'critical',
+        'ai': 'low',
+        'admin.get_users': 'low',
+        'admin.get_logs': 'low',
+        'ticketlistresource:GET': 'low',
+        'ticketchangelistresource': 'low',
+        'ticketattachmentresource:GET': 'low',
+    }
+    # Identical concurrent ticket reads share one query and serialized body
+    REQUEST_COALESCING_ENABLED = os.environ.get('REQUEST_COALESCING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    REQUEST_COALESCING_TIMEOUT = 30
+    # Negotiated response compression (br needs the optional brotli package), skipped for small
+    # bodies; compressed payloads are kept in an LRU so hot responses are compressed once
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESSION_ENCODINGS = ['br', 'gzip']
+    COMPRESSION_LEVELS = {'br': 5, 'gzip': 6}
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_CACHE_BYTES = 32 * 1024 * 1024
+    # Tickets closed for ARCHIVE_AFTER_DAYS move to gzip'd NDJSON segments under ARCHIVE_PATH,
+    # compressed in blocks of ARCHIVE_BLOCK_SIZE tickets so a single archived ticket reads fast
+    ARCHIVE_PATH = os.environ.get('ARCHIVE_PATH') or os.path.join(basedir, 'instance', 'archive')
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = 5000
+    ARCHIVE_BLOCK_SIZE = 64
+    # Batched backfills in migrations (app/utils/online_migration.py): the batch size adapts
+    # towards ONLINE_MIGRATION_BATCH_SECONDS per batch, with a pause between batches
+    ONLINE_MIGRATION_BATCH_SIZE = int(os.environ.get('ONLINE_MIGRATION_BATCH_SIZE', 1000))
+    ONLINE_MIGRATION_MAX_BATCH_SIZE = 50000
+    ONLINE_MIGRATION_BATCH_SECONDS = 0.5
+    ONLINE_MIGRATION_PAUSE_SECONDS = float(os.environ.get('ONLINE_MIGRATION_PAUSE_SECONDS', 0.05))
+    # Idempotency-Key on ticket, claim and comment POSTs: first responses are kept for the TTL,
+    # retries of a request still running wait up to IDEMPOTENCY_WAIT_SECONDS for its response
+    IDEMPOTENCY_TTL_HOURS = 24
+    IDEMPOTENCY_LOCK_SECONDS = 60
+    IDEMPOTENCY_WAIT_SECONDS = 30
+    IDEMPOTENCY_POLL_INTERVAL = 0.05
+    # JSON logs of the 'app' loggers go through a bounded queue to a writer thread; records
+    # below WARNING from the loggers in LOG_SAMPLE_RATES are kept for that share of requests
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_QUEUE_SIZE = 10000
+    LOG_ACCESS = os.environ.get('LOG_ACCESS', 'true').lower() in ('1', 'true', 'yes')
+    LOG_SAMPLE_RATES = {'app.access': float(os.environ.get('LOG_ACCESS_SAMPLE_RATE', 0.1))}
+    # Bulk user import: rows are checked and inserted USER_IMPORT_BATCH_SIZE at a time, passwords
+    # hashed on a process pool (defaults to one process per CPU)
+    USER_IMPORT_BATCH_SIZE = 500
+    USER_IMPORT_HASH_WORKERS = int(os.environ.get('USER_IMPORT_HASH_WORKERS', 0)) or None
+    USER_IMPORT_MAX_ERRORS = 1000
     VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY')
     VAPID_PRIVATE_KEY = os.environ.get('VAPID_PRIVATE_KEY')
     VAPID_CLAIM_EMAIL = os.environ.get('VAPID_CLAIM_EMAIL')
-    
\ No newline at end of file
+    # Heavy optional subsystems (ai, push, qr, swagger) are only mounted when listed here.
+    # LEAN_STARTUP skips all of them, e.g. for workers and CLI commands.
+    OPTIONAL_SUBSYSTEMS = (os.environ.get('OPTIONAL_SUBSYSTEMS') or 'ai,push,qr,swagger').split(',')
+    LEAN_STARTUP = os.environ.get('LEAN_STARTUP', 'false').lower() in ('1', 'true', 'yes')
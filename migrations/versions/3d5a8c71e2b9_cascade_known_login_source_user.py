@@ -0,0 +1,35 @@
+"""cascade known login source user
+
+Revision ID: 3d5a8c71e2b9
+Revises: 7f2b95d0c318
+Create Date: 2026-10-19 13:05:42.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d5a8c71e2b9'
+down_revision = '7f2b95d0c318'
+branch_labels = None
+depends_on = None
+
+# Names the constraint SQLite left unnamed so batch mode can drop it
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _replace_user_foreign_key(ondelete):
+    existing = next(fk for fk in sa.inspect(op.get_bind()).get_foreign_keys('known_login_source')
+                    if fk['constrained_columns'] == ['user_id'])
+    with op.batch_alter_table('known_login_source', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(existing['name'] or 'fk_known_login_source_user_id_user', type_='foreignkey')
+        batch_op.create_foreign_key('fk_known_login_source_user_id_user', 'user', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_user_foreign_key('CASCADE')
+
+
+def downgrade():
+    _replace_user_foreign_key(None)
@@ -0,0 +1,52 @@
+"""backfill ticket due_at
+
+Revision ID: 6b0d3f8e4a17
+Revises: 9c4e27b1d856
+Create Date: 2026-10-19 14:02:36.874120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+from app.utils import online_migration
+
+
+# revision identifiers, used by Alembic.
+revision = '6b0d3f8e4a17'
+down_revision = '9c4e27b1d856'
+branch_labels = None
+depends_on = None
+
+ticket = sa.table('ticket', sa.column('id', sa.Integer()), sa.column('status', sa.String()),
+                  sa.column('priority', sa.String()), sa.column('created_at', sa.DateTime()),
+                  sa.column('due_at', sa.DateTime()))
+
+
+def _plus(column, target):
+    seconds = int(target.total_seconds())
+    dialect = op.get_context().dialect.name
+    if dialect == 'sqlite':
+        return sa.func.datetime(column, f'+{seconds} seconds')
+    if dialect in ('mysql', 'mariadb'):
+        return sa.func.date_add(column, sa.text(f'INTERVAL {seconds} SECOND'))
+    return column + sa.text(f"INTERVAL '{seconds} seconds'")
+
+
+def upgrade():
+    # Tickets opened before due_at existed were never put on the SLA clock. They get the deadline
+    # sla_due_at would have given them at creation; overdue ones escalate on the first tick.
+    for priority, target in current_app.config['SLA_POLICIES'].items():
+        if not target:
+            continue
+        matches = ticket.c.priority == priority
+        if priority == 'medium':
+            matches = sa.or_(matches, ticket.c.priority.is_(None))
+        online_migration.backfill(
+            ticket, {'due_at': _plus(ticket.c.created_at, target)}, name=f'ticket:due_at:{priority}',
+            where=sa.and_(matches, ticket.c.status != 'closed', ticket.c.due_at.is_(None),
+                          ticket.c.created_at.isnot(None)))
+
+
+def downgrade():
+    pass
@@ -0,0 +1,27 @@
+"""added revoked token revoked_at index
+
+Revision ID: 7f2b95d0c318
+Revises: 0a6c2d94f1b3
+Create Date: 2026-10-19 12:31:19.055472
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migration
+
+
+# revision identifiers, used by Alembic.
+revision = '7f2b95d0c318'
+down_revision = '0a6c2d94f1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every worker queries it each JWT_REVOCATION_SYNC_SECONDS; built without blocking revocations
+    online_migration.create_index('ix_revoked_token_revoked_at', 'revoked_token', ['revoked_at'])
+
+
+def downgrade():
+    online_migration.drop_index('ix_revoked_token_revoked_at', 'revoked_token')
@@ -0,0 +1,30 @@
+"""backfill failed attempts
+
+Revision ID: 98e236e49317
+Revises: d7e673ca3cec
+Create Date: 2026-10-19 19:12:37.018846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migration
+
+
+# revision identifiers, used by Alembic.
+revision = '98e236e49317'
+down_revision = 'd7e673ca3cec'
+branch_labels = None
+depends_on = None
+
+user = sa.table('user', sa.column('id', sa.Integer()), sa.column('failed_attempts', sa.Integer()))
+
+
+def upgrade():
+    # Users created before 7d1e96563705 have NULL failed_attempts; batched so the user table
+    # stays writable (logins update it) while this runs
+    online_migration.backfill(user, {'failed_attempts': 0}, where=user.c.failed_attempts.is_(None))
+
+
+def downgrade():
+    pass
@@ -0,0 +1,45 @@
+"""set null user references
+
+Revision ID: 9c4e27b1d856
+Revises: 3d5a8c71e2b9
+Create Date: 2026-10-19 13:41:07.523914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e27b1d856'
+down_revision = '3d5a8c71e2b9'
+branch_labels = None
+depends_on = None
+
+# Names the constraints SQLite left unnamed so batch mode can drop them
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+# (table, column, batch table kwargs); the rebuild on SQLite must keep AUTOINCREMENT
+USER_REFERENCES = [
+    ('ticket', 'assignee_id', {}),
+    ('ticket_comment', 'author_id', {}),
+    ('ticket_attachment', 'uploaded_by', {}),
+    ('revoked_token', 'user_id', {'sqlite_autoincrement': True}),
+]
+
+
+def _replace_user_foreign_keys(ondelete):
+    inspector = sa.inspect(op.get_bind())
+    for table, column, table_kwargs in USER_REFERENCES:
+        existing = next(fk for fk in inspector.get_foreign_keys(table) if fk['constrained_columns'] == [column])
+        name = f'fk_{table}_{column}_user'
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION,
+                                  table_kwargs=table_kwargs) as batch_op:
+            batch_op.drop_constraint(existing['name'] or name, type_='foreignkey')
+            batch_op.create_foreign_key(name, 'user', [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_user_foreign_keys('SET NULL')
+
+
+def downgrade():
+    _replace_user_foreign_keys(None)
@@ -0,0 +1,32 @@
+"""backfill ticket priority source
+
+Revision ID: e41a6f3d92c8
+Revises: b3d81c5e0f27
+Create Date: 2026-10-19 11:43:51.260477
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migration
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41a6f3d92c8'
+down_revision = 'b3d81c5e0f27'
+branch_labels = None
+depends_on = None
+
+ticket = sa.table('ticket', sa.column('id', sa.Integer()), sa.column('priority_source', sa.String()),
+                  sa.column('escalated_at', sa.DateTime()))
+
+
+def upgrade():
+    # Escalated tickets carry the priority SLA escalation gave them. Priorities predicted before
+    # the source was tracked cannot be told apart and stay NULL, which training treats as human.
+    online_migration.backfill(ticket, {'priority_source': 'sla'},
+                              where=sa.and_(ticket.c.escalated_at.isnot(None), ticket.c.priority_source.is_(None)))
+
+
+def downgrade():
+    pass
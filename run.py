@@ -1,14 +1,15 @@
-from app import create_app, socketio
+import os
 import threading
 
+from app import create_app, socketio
+
 app = create_app()
 
 if __name__ == '__main__':
-    from app.tasks import run_scheduler
-    
-    # Start the scheduler in a background thread
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)  # Run the Flask app and SocketIO server in the same
-    
-    app.run(debug=True)
+    # Development server with the reloader; use serve.py in production.
+    # Only start the scheduler in the reloader's child process, not in the watcher as well.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from app.tasks import run_scheduler
+        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
+        scheduler_thread.start()
+    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,314 @@
+"""
+Production entry point: a master process that owns the listening socket, N preforked
+eventlet workers and the scheduler in its own process.
+
+    python serve.py --workers 4 --connections 1000 --bind 0.0.0.0:5000
+
+The master accepts connections and hands each one to a worker chosen by a hash of the
+client address, so the Socket.IO polling requests of a client always reach the worker
+that holds its session. Workers are fresh interpreters started with the file descriptor
+of their end of a Unix socket pair, over which they receive the accepted connections.
+
+Signals sent to the master:
+    SIGHUP           graceful reload: start a new generation of workers, switch each worker
+                     slot over once its replacement is ready, then drain the old worker (no
+                     new connections, in-flight requests finish); the scheduler is restarted
+                     once the old one has stopped
+    SIGTERM, SIGINT  graceful stop: drain every worker, then exit
+"""
+import argparse
+import errno
+import json
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+
+from config import Config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def log(message):
+    print(f'[{os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+
+class Worker:
+    def __init__(self, index, generation, args):
+        self.index = index
+        self.generation = generation
+        self.channel, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'serve.py'), 'worker', '--fd', str(child.fileno()),
+             '--bind', args.bind, '--connections', str(args.connections),
+             '--graceful-timeout', str(args.graceful_timeout)],
+            pass_fds=[child.fileno()], cwd=ROOT,
+        )
+        child.close()
+        self.ready = False
+        self.retired_at = None
+        log(f'worker {index} (generation {generation}) started as pid {self.process.pid}')
+
+    def handoff(self, connection, address, accepted_at):
+        socket.send_fds(self.channel, [json.dumps([*address[:2], accepted_at]).encode()], [connection.fileno()])
+
+
+class Master:
+    def __init__(self, args):
+        self.args = args
+        self.generation = 0
+        self.active = [None] * args.workers
+        self.starting = {}
+        self.retiring = []
+        self.scheduler = None
+        self.scheduler_started_at = 0
+        self.retiring_scheduler = None
+        self.stopping = False
+        self.reload_requested = False
+        self.selector = selectors.DefaultSelector()
+
+    def run(self):
+        host, port = self.args.bind.rsplit(':', 1)
+        self.listener = socket.create_server((host, int(port)), backlog=2048)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, self.accept)
+
+        wakeup_read, wakeup_write = socket.socketpair()
+        wakeup_read.setblocking(False)
+        wakeup_write.setblocking(False)
+        signal.set_wakeup_fd(wakeup_write.fileno())
+        self.selector.register(wakeup_read, selectors.EVENT_READ, lambda: wakeup_read.recv(512))
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, 'reload_requested', True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+        log(f'listening on {self.args.bind} with {self.args.workers} workers')
+        self.spawn_generation()
+        while not self.stopping:
+            for key, _ in self.selector.select(timeout=1):
+                key.data()
+            if self.reload_requested:
+                self.reload_requested = False
+                log('reloading')
+                self.spawn_generation()
+                self.retire_scheduler()
+            self.reap()
+        self.shutdown()
+
+    def spawn_generation(self):
+        self.generation += 1
+        for index in range(self.args.workers):
+            self.spawn(index)
+
+    def spawn(self, index):
+        # A replacement still starting from an earlier reload is superseded by this one
+        if index in self.starting:
+            self.retire(self.starting.pop(index))
+        worker = Worker(index, self.generation, self.args)
+        self.starting[index] = worker
+        self.selector.register(worker.channel, selectors.EVENT_READ, lambda: self.on_message(worker))
+
+    def on_message(self, worker):
+        try:
+            message = worker.channel.recv(64)
+        except OSError:
+            message = b''
+        if message == b'ready' and self.starting.get(worker.index) is worker:
+            worker.ready = True
+            del self.starting[worker.index]
+            previous, self.active[worker.index] = self.active[worker.index], worker
+            if previous:
+                self.retire(previous)
+            log(f'worker {worker.index} (generation {worker.generation}) ready')
+        elif not message:
+            self.selector.unregister(worker.channel)
+
+    def accept(self):
+        while True:
+            try:
+                connection, address = self.listener.accept()
+            except BlockingIOError:
+                return
+            with connection:
+                self.route(connection, address, time.time())
+
+    def route(self, connection, address, accepted_at):
+        slot = zlib.crc32(address[0].encode()) % len(self.active)
+        # Sticky: the same client address always maps to the same slot while its worker is up
+        for offset in range(len(self.active)):
+            worker = self.active[(slot + offset) % len(self.active)]
+            if worker is None:
+                continue
+            try:
+                worker.handoff(connection, address, accepted_at)
+                return
+            except OSError:
+                self.forget(worker)
+        log(f'no worker available, dropping connection from {address[0]}')
+
+    def forget(self, worker):
+        if self.active[worker.index] is worker:
+            self.active[worker.index] = None
+        try:
+            self.selector.unregister(worker.channel)
+        except (KeyError, ValueError):
+            pass
+        worker.channel.close()
+
+    def retire(self, worker):
+        """Close the worker's channel: it stops accepting, drains in-flight requests and exits."""
+        self.forget(worker)
+        worker.retired_at = time.monotonic()
+        self.retiring.append(worker)
+
+    def reap(self):
+        now = time.monotonic()
+        for index, worker in list(enumerate(self.active)) + list(self.starting.items()):
+            if worker is not None and worker.process.poll() is not None:
+                log(f'worker {index} (pid {worker.process.pid}) exited with {worker.process.returncode}')
+                if self.starting.get(index) is worker:
+                    del self.starting[index]
+                self.forget(worker)
+                if not self.stopping and index not in self.starting:
+                    self.spawn(index)
+        for worker in list(self.retiring):
+            if worker.process.poll() is not None:
+                self.retiring.remove(worker)
+            elif now - worker.retired_at > self.args.graceful_timeout + 5:
+                log(f'killing worker pid {worker.process.pid} after graceful timeout')
+                worker.process.kill()
+        if self.retiring_scheduler is not None:
+            scheduler, retired_at = self.retiring_scheduler
+            if scheduler.poll() is not None:
+                self.retiring_scheduler = None
+            elif now - retired_at > self.args.graceful_timeout:
+                log(f'killing scheduler pid {scheduler.pid} after graceful timeout')
+                scheduler.kill()
+        # The next scheduler only starts once the previous one is gone, so jobs never run twice
+        if self.args.scheduler and not self.stopping and self.retiring_scheduler is None:
+            if self.scheduler is None or self.scheduler.poll() is not None:
+                # Back off a crashing scheduler instead of restarting it in a tight loop
+                if now - self.scheduler_started_at > 5:
+                    self.scheduler = subprocess.Popen([sys.executable, '-m', 'app.tasks'], cwd=ROOT)
+                    self.scheduler_started_at = now
+                    log(f'scheduler started as pid {self.scheduler.pid}')
+
+    def retire_scheduler(self):
+        """Ask the scheduler to stop without waiting for it; reap() kills it after the graceful timeout."""
+        if self.scheduler is not None and self.scheduler.poll() is None:
+            self.scheduler.terminate()
+            self.retiring_scheduler = (self.scheduler, time.monotonic())
+        self.scheduler = None
+        self.scheduler_started_at = 0
+
+    def shutdown(self):
+        log('stopping')
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        self.retire_scheduler()
+        for worker in [worker for worker in self.active if worker] + list(self.starting.values()):
+            self.retire(worker)
+        self.starting = {}
+        while self.retiring or self.retiring_scheduler:
+            time.sleep(0.1)
+            self.reap()
+        log('stopped')
+
+
+class HandoffListener:
+    """
+    Stands in for the listening socket in eventlet.wsgi.server: accept() receives the next
+    connection from the master, and raises EPIPE once the master closes the channel, which
+    makes the server stop accepting and wait for in-flight requests.
+    """
+    def __init__(self, channel, address, on_close):
+        self.channel = channel
+        self.address = address
+        self.family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        self.on_close = on_close
+
+    def accept(self):
+        from eventlet.hubs import trampoline
+        while True:
+            try:
+                message, fds, _, _ = socket.recv_fds(self.channel, 1024, 1)
+            except BlockingIOError:
+                trampoline(self.channel.fileno(), read=True)
+                continue
+            except OSError:
+                message, fds = b'', []
+            if not message:
+                self.on_close()
+                raise OSError(errno.EPIPE, 'master closed the channel')
+            host, port, accepted_at = json.loads(message)
+            connection = socket.socket(fileno=fds[0])
+            connection.accepted_at = accepted_at
+            return connection, (host, port)
+
+    def getsockname(self):
+        return self.address
+
+    def close(self):
+        self.channel.close()
+
+
+def worker(args):
+    import eventlet
+    eventlet.monkey_patch()
+    import eventlet.wsgi
+    from app import create_app, socketio
+    from app.utils.load_shedding import ACCEPTED_AT_KEY
+
+    class HandoffProtocol(eventlet.wsgi.HttpProtocol):
+        def get_environ(self):
+            environ = super().get_environ()
+            # The first request of a connection carries the time the master accepted it, so the
+            # load shedder sees the wait in the master and for a slot in the connection pool
+            accepted_at = getattr(self.request, 'accepted_at', None)
+            if accepted_at is not None:
+                self.request.accepted_at = None
+                environ[ACCEPTED_AT_KEY] = accepted_at
+            return environ
+
+    app = create_app()
+    channel = socket.socket(fileno=args.fd)
+    host, port = args.bind.rsplit(':', 1)
+
+    def drain():
+        log('draining')
+        # Give Socket.IO clients a transport close so they reconnect to another worker
+        socketio.server.eio.disconnect()
+        eventlet.spawn_after(args.graceful_timeout, os._exit, 0)
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: channel.shutdown(socket.SHUT_RDWR))
+    channel.send(b'ready')
+    eventlet.wsgi.server(HandoffListener(channel, (host, int(port)), drain), app,
+                         max_size=args.connections, protocol=HandoffProtocol, log_output=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('role', nargs='?', choices=['master', 'worker'], default='master')
+    parser.add_argument('--bind', default=Config.WEB_BIND)
+    parser.add_argument('--workers', type=int, default=Config.WEB_WORKERS)
+    parser.add_argument('--connections', type=int, default=Config.WEB_WORKER_CONNECTIONS,
+                        help='concurrent connections per worker')
+    parser.add_argument('--graceful-timeout', type=int, default=Config.WEB_GRACEFUL_TIMEOUT)
+    parser.add_argument('--no-scheduler', dest='scheduler', action='store_false',
+                        help='do not run the scheduler (e.g. on all but one host)')
+    parser.add_argument('--fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.role == 'worker':
+        worker(args)
+    else:
+        Master(args).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import pytest
+
+from app import create_app, db
+from app.models import User
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        # A file database so concurrent requests get their own connections
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        # Enforce foreign keys like PostgreSQL does
+        SQLITE_PRAGMAS = {**Config.SQLITE_PRAGMAS, 'foreign_keys': 'ON'}
+        LEAN_STARTUP = True
+        RATELIMIT_ENABLED = False
+        LOAD_SHEDDING_ENABLED = False
+        MAIL_SUPPRESS_SEND = True
+        MAIL_DEFAULT_SENDER = 'admin@localhost.com'
+        LOG_ACCESS = False
+        ATTACHMENTS_PATH = str(tmp_path / 'attachments')
+        ARCHIVE_PATH = str(tmp_path / 'archive')
+        RETRIEVAL_INDEX_PATH = str(tmp_path / 'retrieval')
+        TRIAGE_MODEL_PATH = str(tmp_path / 'triage_model.npz')
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user(username='alice', password='correct horse', role='consumer'):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', role=role)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def auth_headers(app):
+    from flask_jwt_extended import create_access_token
+
+    def auth_headers(user_id, role='admin'):
+        with app.app_context():
+            return {'Authorization': f"Bearer {create_access_token(identity={'id': user_id, 'role': role})}"}
+    return auth_headers
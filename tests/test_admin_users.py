@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import KnownLoginSource, RevokedToken, Ticket, TicketAttachment, TicketComment
+from app.utils.pagination import encode_cursor
+
+
+def test_total_only_without_filters(app, make_user, auth_headers):
+    headers = auth_headers(make_user('root', role='admin'))
+    for name in ('alice', 'bob', 'carol'):
+        make_user(name)
+    client = app.test_client()
+
+    page = client.get('/api/admin/users?limit=2', headers=headers).get_json()
+    assert page['total'] == 4
+    assert len(page['users']) == 2
+    page = client.get(f"/api/admin/users?cursor={page['next_cursor']}", headers=headers).get_json()
+    assert [user['username'] for user in page['users']] == ['bob', 'carol']
+
+    page = client.get('/api/admin/users?role=consumer', headers=headers).get_json()
+    assert len(page['users']) == 3
+    assert 'total' not in page
+
+
+def test_cursor_with_a_non_integer_id_is_rejected(app, make_user, auth_headers):
+    headers = auth_headers(make_user('root', role='admin'))
+    client = app.test_client()
+    for cursor in (encode_cursor('1'), encode_cursor({'id': 1}), encode_cursor(True), encode_cursor(1, 2), 'garbage'):
+        response = client.get(f'/api/admin/users?cursor={cursor}', headers=headers)
+        assert response.status_code == 400
+
+
+def test_delete_user_after_login(app, make_user, auth_headers):
+    headers = auth_headers(make_user('root', role='admin'))
+    user_id = make_user('alice')
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={'username': 'alice', 'password': 'correct horse'})
+    assert login.status_code == 200
+
+    assert client.delete(f'/api/admin/users/{user_id}', headers=headers).status_code == 200
+    with app.app_context():
+        assert db.session.query(KnownLoginSource).count() == 0
+
+
+def test_delete_user_keeps_their_tickets_comments_and_revocations(app, make_user, auth_headers):
+    headers = auth_headers(make_user('root', role='admin'))
+    user_id = make_user('bob', role='engineer')
+    client = app.test_client()
+    with app.app_context():
+        ticket = Ticket(title='Laptop', description='Does not boot', assignee_id=user_id)
+        db.session.add(ticket)
+        db.session.flush()
+        db.session.add_all([
+            TicketComment(ticket_id=ticket.id, author_id=user_id, body='On it'),
+            TicketAttachment(ticket_id=ticket.id, uploaded_by=user_id, filename='log.txt', content_type='text/plain',
+                             size=1, sha256='0' * 64),
+            RevokedToken(jti='revoked', token_type='refresh', user_id=user_id,
+                         expires_at=datetime.now() + timedelta(days=1)),
+        ])
+        db.session.commit()
+
+    assert client.delete(f'/api/admin/users/{user_id}', headers=headers).status_code == 200
+    with app.app_context():
+        assert Ticket.query.one().assignee_id is None
+        assert TicketComment.query.one().author_id is None
+        assert TicketAttachment.query.one().uploaded_by is None
+        assert RevokedToken.query.one().user_id is None
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Ticket
+from app.utils.archive import archive_closed_tickets, get_ticket_archive
+
+
+def test_archived_tickets_keep_attachments_and_duplicate_links(app, make_user, auth_headers):
+    headers = auth_headers(make_user(role='admin'))
+    with app.app_context():
+        old = Ticket(title='VPN down', description='Cannot connect', status='closed')
+        db.session.add(old)
+        db.session.commit()
+        old_id = old.id
+    client = app.test_client()
+    response = client.post(f'/api/tickets/{old_id}/attachments?filename=log.txt', data=b'connection refused',
+                           headers={**headers, 'Content-Type': 'application/octet-stream'})
+    assert response.status_code == 201
+    attachment_id = response.get_json()['id']
+
+    with app.app_context():
+        old = db.session.get(Ticket, old_id)
+        old.closed_at = datetime.now() - timedelta(days=100)
+        duplicate = Ticket(title='VPN is down', description='Cannot connect', status='closed', duplicate_of=old_id)
+        db.session.add(duplicate)
+        db.session.commit()
+        duplicate_id = duplicate.id
+
+        assert archive_closed_tickets(90) == 1
+        assert db.session.get(Ticket, old_id) is None
+        assert db.session.get(Ticket, duplicate_id).duplicate_of is None
+        assert get_ticket_archive().get(old_id)['duplicates'] == [duplicate_id]
+
+    response = client.get(f'/api/tickets/{old_id}/attachments/{attachment_id}', headers=headers)
+    assert response.status_code == 200
+    assert response.data == b'connection refused'
+    assert client.get(f'/api/tickets/{old_id}/attachments/{attachment_id + 1}', headers=headers).status_code == 404
+
@@ -0,0 +1,15 @@
+def test_upload_size_limit(app, make_user, auth_headers):
+    headers = auth_headers(make_user('alice'), role='consumer')
+    client = app.test_client()
+    ticket = client.post('/api/tickets', json={'title': 'Laptop', 'description': 'Does not boot'}, headers=headers)
+    url = f"/api/tickets/{ticket.get_json()['id']}/attachments?filename=log.txt"
+
+    app.config['ATTACHMENT_MAX_BYTES'] = 4
+    app.extensions.pop('attachment_store', None)
+    assert client.post(url, data=b'0123456789', headers=headers).status_code == 413
+
+    app.config['ATTACHMENT_MAX_BYTES'] = None
+    app.extensions.pop('attachment_store', None)
+    response = client.post(url, data=b'0123456789', headers=headers)
+    assert response.status_code == 201
+    assert response.get_json()['size'] == 10
@@ -0,0 +1,10 @@
+def test_logs_filtered_by_user_id(app, make_user, auth_headers):
+    headers = auth_headers(make_user('root', role='admin'))
+    user_id = make_user('alice')
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': 'alice', 'password': 'correct horse'})
+    client.post('/api/auth/login', json={'username': 'root', 'password': 'correct horse'})
+
+    logs = client.get(f'/api/admin/logs?user_id={user_id}', headers=headers).get_json()['logs']
+    assert [(log['user_id'], log['event']) for log in logs] == [(user_id, 'LOGIN_SUCCESS')]
+    assert client.get('/api/admin/logs?user_id=abc', headers=headers).status_code == 400
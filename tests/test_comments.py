@@ -0,0 +1,34 @@
+from app import db
+from app.models import Ticket, TicketComment
+
+
+def test_comment_count_follows_adds_and_removes(app, make_user, auth_headers):
+    headers = auth_headers(make_user('bob', role='engineer'), role='engineer')
+    client = app.test_client()
+    with app.app_context():
+        ticket = Ticket(title='Laptop', description='Does not boot')
+        db.session.add(ticket)
+        db.session.commit()
+        ticket_id = ticket.id
+    url = f'/api/tickets/{ticket_id}/comments'
+    comments = [client.post(url, json={'body': f'Comment {i}'}, headers=headers).get_json() for i in range(3)]
+
+    assert client.delete(f"{url}/{comments[0]['id']}", headers=headers).status_code == 200
+    assert client.delete(f"{url}/{comments[0]['id']}", headers=headers).status_code == 404
+    with app.app_context():
+        assert db.session.get(Ticket, ticket_id).comment_count == 2
+
+
+def test_concurrent_removes_count_once(app):
+    with app.app_context():
+        ticket = Ticket(title='Laptop', description='Does not boot')
+        db.session.add(ticket)
+        db.session.flush()
+        comment = TicketComment.add(ticket, None, 'Rebooted')
+        db.session.commit()
+
+        # Both requests loaded the comment before either deleted it
+        assert TicketComment.remove(comment)
+        assert not TicketComment.remove(comment)
+        db.session.commit()
+        assert db.session.get(Ticket, ticket.id).comment_count == 0
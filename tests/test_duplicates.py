@@ -0,0 +1,65 @@
+from app.utils.duplicates import DuplicateIndex
+
+TEXT = {'title': 'Printer on floor two', 'description': 'The printer on floor two jams on every page', 'priority': 'low'}
+
+
+def test_closed_ticket_is_no_longer_reported(app, make_user, auth_headers):
+    consumer = auth_headers(make_user('alice'), role='consumer')
+    engineer = auth_headers(make_user('bob', role='engineer'), role='engineer')
+    client = app.test_client()
+    first = client.post('/api/tickets', json=TEXT, headers=consumer).get_json()
+    second = client.post('/api/tickets', json=TEXT, headers=consumer).get_json()
+    assert [duplicate['id'] for duplicate in second['duplicates']] == [first['id']]
+
+    client.put(f"/api/tickets/{first['id']}", json={**TEXT, 'status': 'closed'}, headers=engineer)
+    client.delete(f"/api/tickets/{second['id']}", headers=engineer)
+    assert client.post('/api/tickets', json=TEXT, headers=consumer).get_json()['duplicates'] == []
+
+    client.put(f"/api/tickets/{first['id']}", json={**TEXT, 'status': 'open'}, headers=engineer)
+    third = client.post('/api/tickets', json=TEXT, headers=consumer).get_json()
+    assert first['id'] in [duplicate['id'] for duplicate in third['duplicates']]
+
+
+def test_tickets_without_tokens_are_not_duplicates(app, make_user, auth_headers):
+    consumer = auth_headers(make_user('alice'), role='consumer')
+    client = app.test_client()
+    client.post('/api/tickets', json={'title': '???', 'description': '!!!'}, headers=consumer)
+    response = client.post('/api/tickets', json={'title': '...', 'description': '-'}, headers=consumer)
+    assert response.get_json()['duplicates'] == []
+
+
+def test_eviction_from_merged_arrays():
+    index = DuplicateIndex(bands=4, rows=2, merge_every=2)
+    signature = index.hasher.signature('printer jams on every page')
+    other = index.hasher.signature('vpn drops every hour')
+    for ticket_id in (1, 2, 3):
+        index.add(ticket_id, signature)
+    index.add(4, other)
+    assert len(index.ids) == 4 and not index.pending
+
+    with index.lock:
+        index._remove(1)
+    assert [ticket_id for ticket_id, _ in index.query(signature, 0.5)] == [2, 3]
+    with index.lock:
+        index._remove(2)
+    assert len(index.ids) == 2 and not index.evicted
+    assert [ticket_id for ticket_id, _ in index.query(signature, 0.5)] == [3]
+    index.add(1, signature)
+    assert sorted(ticket_id for ticket_id, _ in index.query(signature, 0.5)) == [1, 3]
+    assert index.query(other, 0.5) == [(4, 1.0)]
+
+
+def test_deleting_the_original_unlinks_its_duplicates(app, make_user, auth_headers):
+    app.config['DUPLICATE_AUTOLINK_THRESHOLD'] = 0.9
+    consumer = auth_headers(make_user('alice'), role='consumer')
+    engineer = auth_headers(make_user('bob', role='engineer'), role='engineer')
+    client = app.test_client()
+    original = client.post('/api/tickets', json=TEXT, headers=consumer).get_json()
+    duplicate = client.post('/api/tickets', json=TEXT, headers=consumer).get_json()
+    assert duplicate['duplicate_of'] == original['id']
+
+    assert client.delete(f"/api/tickets/{original['id']}", headers=engineer).status_code == 200
+    assert client.get(f"/api/tickets/{duplicate['id']}", headers=engineer).get_json()['duplicate_of'] is None
+    changes = client.get('/api/tickets/changes', headers=engineer).get_json()['changes']
+    assert [(change['ticket_id'], change['action']) for change in changes][-2:] == \
+        [(original['id'], 'deleted'), (duplicate['id'], 'updated')]
@@ -0,0 +1,43 @@
+import pytest
+
+from app import db
+from app.models import Ticket
+
+
+def test_failure_after_commit_keeps_the_key(app, make_user, auth_headers, monkeypatch):
+    headers = {**auth_headers(make_user(role='consumer'), role='consumer'), 'Idempotency-Key': 'create-1'}
+    ticket = {'title': 'Laptop', 'description': 'Does not boot', 'priority': 'low'}
+
+    def fail(ticket):
+        raise OSError('index is not writable')
+    monkeypatch.setattr('app.utils.retrieval.index_ticket', fail)
+    client = app.test_client()
+    # The ticket is committed before indexing fails
+    with pytest.raises(OSError):
+        client.post('/api/tickets', json=ticket, headers=headers)
+
+    monkeypatch.undo()
+    response = client.post('/api/tickets', json=ticket, headers=headers)
+    assert response.status_code == 500
+    assert response.headers['Idempotent-Replayed'] == 'true'
+    with app.app_context():
+        assert db.session.query(Ticket).count() == 1
+
+
+def test_failure_before_commit_releases_the_key(app, make_user, auth_headers, monkeypatch):
+    headers = {**auth_headers(make_user(role='consumer'), role='consumer'), 'Idempotency-Key': 'create-1'}
+    ticket = {'title': 'Laptop', 'description': 'Does not boot', 'priority': 'low'}
+
+    def fail(title, description):
+        raise OSError('duplicate index unavailable')
+    monkeypatch.setattr('app.utils.duplicates.find_duplicates', fail)
+    client = app.test_client()
+    with pytest.raises(OSError):
+        client.post('/api/tickets', json=ticket, headers=headers)
+
+    monkeypatch.undo()
+    response = client.post('/api/tickets', json=ticket, headers=headers)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    with app.app_context():
+        assert db.session.query(Ticket).count() == 1
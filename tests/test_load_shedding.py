@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from app.utils.load_shedding import ACCEPTED_AT_KEY
+
+
+@pytest.fixture
+def shedder(app):
+    # The test config turns shedding off; the hooks are registered either way
+    shedder = app.extensions['load_shedder']
+    shedder.enabled = True
+    return shedder
+
+
+def test_client_request_start_is_ignored(app, shedder, make_user, auth_headers):
+    headers = auth_headers(make_user(), role='consumer')
+    client = app.test_client()
+    client.get('/api/tickets/1', headers={'X-Request-Start': 't=1'})
+    assert shedder.latency == 0
+    assert client.get('/api/tickets', headers=headers).status_code == 200
+
+
+def test_trusted_request_start_is_clamped(app, shedder):
+    shedder.trust_request_start = True
+    client = app.test_client()
+    client.get('/api/tickets/1', headers={'X-Request-Start': 't=1'})
+    assert shedder.latency <= 0.1 * 3 * shedder.window
+
+
+def test_accepted_at_from_serve_is_used(app, shedder):
+    client = app.test_client()
+    client.get('/api/tickets/1', environ_base={ACCEPTED_AT_KEY: time.time() - 1},
+               headers={'X-Request-Start': 't=1'})
+    assert 0.09 < shedder.latency < 0.11
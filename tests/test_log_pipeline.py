@@ -0,0 +1,17 @@
+import io
+import json
+import logging
+
+from app.utils.log_pipeline import LogPipeline
+
+
+def test_pipeline_writes_json_lines_and_stops_twice():
+    stream = io.StringIO()
+    pipeline = LogPipeline(logging.INFO, 100, {}, stream=stream)
+    pipeline.start()
+    assert pipeline.listener._thread.name == 'log-pipeline'
+    pipeline.handler.handle(logging.makeLogRecord({'name': 'app.test', 'levelno': logging.INFO, 'levelname': 'INFO',
+                                                   'msg': 'hello %s', 'args': ('world',)}))
+    pipeline.stop()
+    pipeline.stop()
+    assert json.loads(stream.getvalue())['message'] == 'hello world'
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models import AuthenticationLog, User
+
+
+def test_lockout_threshold_holds_under_parallel_failed_logins(app, make_user):
+    user_id = make_user(password='correct horse')
+    attempts = 20
+
+    def login(_):
+        with app.test_client() as client:
+            return client.post('/api/auth/login', json={'username': 'alice', 'password': 'wrong'}).status_code
+
+    with ThreadPoolExecutor(attempts) as pool:
+        statuses = list(pool.map(login, range(attempts)))
+
+    max_attempts = app.config['MAX_FAILED_LOGIN_ATTEMPTS']
+    # The attempts before the threshold are counted, the one reaching it locks, the rest are refused
+    assert statuses.count(401) == max_attempts - 1
+    assert statuses.count(403) == attempts - (max_attempts - 1)
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.is_locked()
+        assert user.failed_attempts == 0
+        events = [event for event, in AuthenticationLog.query.with_entities(AuthenticationLog.event)]
+        assert events.count('ACCOUNT_LOCKED') == 1
+        assert events.count('LOGIN_FAILURE') == max_attempts - 1
+        assert events.count('LOGIN_ATTEMPT_LOCKED') == attempts - max_attempts
@@ -0,0 +1,24 @@
+from app import db
+from app.models import AuthenticationLog, KnownLoginSource
+
+
+def test_first_logins_from_the_same_address_race(app, make_user, monkeypatch):
+    make_user()
+    client = app.test_client()
+    assert client.post('/api/auth/login', json={'username': 'alice', 'password': 'correct horse'}).status_code == 200
+
+    # The second login's UPDATE ran before the first one committed its row
+    from app.logger import _touch_login_source
+    calls = []
+
+    def touch(*args):
+        calls.append(args)
+        return 0 if len(calls) == 1 else _touch_login_source(*args)
+    monkeypatch.setattr('app.logger._touch_login_source', touch)
+    response = client.post('/api/auth/login', json={'username': 'alice', 'password': 'correct horse'},
+                           headers={'User-Agent': 'second'})
+    assert response.status_code == 200
+    with app.app_context():
+        assert [source.user_agent for source in KnownLoginSource.query.all()] == ['second']
+        assert len(calls) == 2
+        assert AuthenticationLog.query.filter_by(event='LOGIN_SUCCESS').count() == 2
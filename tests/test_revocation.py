@@ -0,0 +1,46 @@
+import uuid
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_refresh_token, decode_token
+
+from app import db
+from app.models import RevokedToken
+from app.utils.revocation import get_revocation_list, revoke_token
+
+
+def test_refresh_token_already_revoked_by_another_worker(app, make_user):
+    user_id = make_user()
+    client = app.test_client()
+    with app.app_context():
+        refresh_token = create_refresh_token(identity={'id': user_id, 'role': 'consumer'})
+        payload = decode_token(refresh_token)
+        get_revocation_list().sync()
+        # Committed by a concurrent refresh on another worker, not yet synced into this one
+        assert revoke_token(payload)
+        db.session.commit()
+        get_revocation_list().expiries.clear()
+
+    response = client.post('/api/auth/refresh', headers={'Authorization': f'Bearer {refresh_token}'})
+    assert response.status_code == 401
+    with app.app_context():
+        assert db.session.query(RevokedToken).count() == 1
+
+
+def test_sync_sees_rows_committed_out_of_order(app):
+    with app.app_context():
+        revocation_list = get_revocation_list()
+        revocation_list.sync()
+        expires_at = datetime.now() + timedelta(hours=1)
+        # Two concurrent revocations: the one with the lower id commits after the other was synced
+        late = RevokedToken(id=5, jti=str(uuid.uuid4()), token_type='access', expires_at=expires_at,
+                            revoked_at=datetime.now() - timedelta(seconds=5))
+        db.session.add(RevokedToken(id=10, jti=str(uuid.uuid4()), token_type='access', expires_at=expires_at))
+        db.session.commit()
+        revocation_list.synced_at = float('-inf')
+        revocation_list.sync()
+        db.session.add(late)
+        db.session.commit()
+
+        revocation_list.synced_at = float('-inf')
+        revocation_list.sync()
+        assert revocation_list.is_revoked(late.jti)
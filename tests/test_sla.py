@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Ticket
+from app.utils.sla import EscalationEngine, TimerWheel
+
+
+def test_deadline_inside_a_tick_is_escalated_on_a_later_tick(app):
+    tick_seconds = app.config['SLA_TICK_SECONDS']
+    now = datetime.now().timestamp()
+    base = datetime.fromtimestamp(now - now % tick_seconds)
+    with app.app_context():
+        ticket = Ticket(title='Printer', description='Out of toner', priority='low',
+                        due_at=base + timedelta(seconds=25))
+        db.session.add(ticket)
+        db.session.commit()
+        ticket_id = ticket.id
+
+    engine = EscalationEngine(app)
+    engine.wheel = TimerWheel(tick_seconds, app.config['SLA_WHEEL_SLOTS'], base)
+    # The deadline's tick comes up before the deadline itself
+    assert engine.tick(base + timedelta(seconds=10)) == []
+    assert [ticket.id for ticket in engine.tick(base + timedelta(seconds=40))] == [ticket_id]
+    assert engine.tick(base + timedelta(seconds=400)) == []
+
+    with app.app_context():
+        ticket = db.session.get(Ticket, ticket_id)
+        assert ticket.priority == 'medium'
+        assert ticket.escalated_at == base + timedelta(seconds=40)
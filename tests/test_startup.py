@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lean_startup_does_not_import_numpy(tmp_path):
+    code = 'import sys; from app import create_app; create_app(); print("numpy" in sys.modules)'
+    env = {**os.environ, 'LEAN_STARTUP': '1', 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}"}
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
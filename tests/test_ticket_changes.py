@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Ticket, TicketEvent
+
+
+def test_cursor_expires_only_when_a_later_tombstone_was_dropped(app, make_user, auth_headers):
+    headers = auth_headers(make_user(role='engineer'), role='engineer')
+    client = app.test_client()
+    with app.app_context():
+        ticket = Ticket(title='Scanner', description='Offline')
+        db.session.add(ticket)
+        TicketEvent.record(ticket, 'created')
+        db.session.commit()
+        db.session.delete(ticket)
+        TicketEvent.record(ticket, 'deleted')
+        db.session.commit()
+
+    cursor = client.get('/api/tickets/changes', headers=headers).get_json()['next_cursor']
+    with app.app_context():
+        # A week without changes: nothing was compacted away after the cursor
+        TicketEvent.query.update({TicketEvent.created_at: datetime.now() - timedelta(days=30)})
+        db.session.commit()
+        TicketEvent.compact(retention_days=7)
+    response = client.get('/api/tickets/changes', headers=headers, query_string={'since': cursor})
+    assert response.status_code == 200
+    assert response.get_json()['changes'] == []
+
+    with app.app_context():
+        ticket = Ticket(title='Scanner', description='Offline again')
+        db.session.add(ticket)
+        TicketEvent.record(ticket, 'created')
+        db.session.commit()
+        db.session.delete(ticket)
+        TicketEvent.record(ticket, 'deleted')
+        db.session.commit()
+        TicketEvent.query.update({TicketEvent.created_at: datetime.now() - timedelta(days=30)})
+        db.session.commit()
+        TicketEvent.compact(retention_days=7)
+    # The deletion after the cursor is gone from the feed
+    assert client.get('/api/tickets/changes', headers=headers, query_string={'since': cursor}).status_code == 410
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+from app.utils.user_import import UserImport
+
+
+@pytest.fixture
+def admin_headers(app, make_user, auth_headers):
+    app.config['USER_IMPORT_HASH_WORKERS'] = 1
+    return auth_headers(make_user('root', role='admin'))
+
+
+def ndjson(*rows):
+    return '\n'.join(json.dumps(row) for row in rows) + '\n'
+
+
+def row(username, role='consumer', **fields):
+    return {'username': username, 'email': f'{username}@example.com', 'password': 'correct horse', 'role': role, **fields}
+
+
+def test_import_csv(app, admin_headers):
+    body = ('username,email,password,role\n'
+            'carol,carol@example.com,correct horse,engineer\n'
+            'dave,dave@example.com,correct horse,wizard\n'
+            'erin,,correct horse,consumer\n')
+    response = app.test_client().post('/api/admin/users/import', data=body, content_type='text/csv', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'created': 1,
+        'failed': 2,
+        'errors': [{'row': 2, 'username': 'dave', 'error': 'Invalid role'},
+                   {'row': 3, 'username': 'erin', 'error': 'Missing email'}],
+        'errors_truncated': False,
+    }
+    with app.app_context():
+        carol = User.query.filter_by(username='carol').one()
+        assert carol.role == 'engineer' and carol.check_password('correct horse')
+
+
+def test_import_ndjson_rejects_duplicates_and_taken_names_in_row_order(app, admin_headers, make_user):
+    make_user('alice')
+    body = ndjson(row('frank'), row('alice'), row('frank', email='other@example.com'), 'not an object', row('grace'))
+    response = app.test_client().post('/api/admin/users/import', data=body, content_type='application/x-ndjson',
+                                      headers=admin_headers)
+
+    # The taken username is only found once the batch is checked against the table, after the
+    # validation errors of later rows
+    report = response.get_json()
+    assert report['created'] == 2
+    assert report['errors'] == [
+        {'row': 2, 'username': 'alice', 'error': 'Username or email already taken'},
+        {'row': 3, 'username': 'frank', 'error': 'Duplicate username or email in the import'},
+        {'row': 4, 'username': None, 'error': 'Invalid JSON object'},
+    ]
+    with app.app_context():
+        assert {username for username, in db.session.query(User.username)} == {'root', 'alice', 'frank', 'grace'}
+
+
+def test_import_caps_errors(app, admin_headers):
+    app.config['USER_IMPORT_BATCH_SIZE'] = 2
+    app.config['USER_IMPORT_MAX_ERRORS'] = 3
+    body = ndjson(*[row(f'user{i}', role='wizard') for i in range(5)], row('heidi'))
+    response = app.test_client().post('/api/admin/users/import', data=body, content_type='application/x-ndjson',
+                                      headers=admin_headers)
+
+    report = response.get_json()
+    assert report['created'] == 1
+    assert report['failed'] == 5
+    assert [error['row'] for error in report['errors']] == [1, 2, 3]
+    assert report['errors_truncated'] is True
+
+
+def test_import_retries_row_by_row_after_a_concurrent_signup(app):
+    class SignupDuringHashing:
+        """Hashes in-process, creating 'judy' as a concurrent registration would meanwhile."""
+        def map(self, fn, items, chunksize=1):
+            with db.engine.begin() as connection:
+                connection.execute(db.insert(User), {'username': 'judy', 'email': 'judy@example.com', 'role': 'consumer',
+                                                     'password_hash': generate_password_hash('hunter2')})
+            return list(map(fn, items))
+
+    with app.app_context():
+        user_import = UserImport(SignupDuringHashing(), 1, batch_size=10, max_errors=10)
+        report = user_import.run(enumerate([row('ivan'), row('judy'), row('kim')], 1))
+
+        assert report == {
+            'created': 2,
+            'failed': 1,
+            'errors': [{'row': 2, 'username': 'judy', 'error': 'Username or email already taken'}],
+            'errors_truncated': False,
+        }
+        assert [username for username, _, _ in user_import.created] == ['ivan', 'kim']
+        assert User.query.filter_by(username='judy').one().check_password('hunter2')